@@ -16,6 +16,8 @@ def register_extensions(app):
       app (app): The Flask application
     """
     from .modules.extensions import db, login_manager, bcrypt
+    from .modules.routing import replica_binds
+    from .modules.database import engine_options
     from flask_cors import CORS
 
     db_user = os.getenv("DB_USER")
@@ -28,6 +30,15 @@ def register_extensions(app):
         f"postgresql+psycopg2://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
     )
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Pool size, timeouts and PgBouncer mode come from DB_* variables
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options()
+    # Optional read replicas (DB_READ_HOST); GET requests on the API read
+    # from one of them, everything else uses the primary above. Binds do not
+    # inherit the default engine options, so each gets its own copy
+    app.config["SQLALCHEMY_BINDS"] = {
+        key: {"url": url, **engine_options()}
+        for key, url in replica_binds(db_user, db_password, db_port, db_name).items()
+    }
 
     # Initialize db first
     db.init_app(app)
@@ -46,6 +57,22 @@ def register_extensions(app):
     # Initialize bcrypt
     bcrypt.init_app(app)
 
+    # Initialize the catalog response cache
+    from .modules.cache import catalog_cache
+    catalog_cache.init_app(app)
+
+    # Server-Timing header and per-request SQL accounting
+    from .modules.request_timing import request_timing
+    request_timing.init_app(app)
+
+    # Opt-in slow query capture with sampled EXPLAIN plans (SLOW_QUERY_MS)
+    from .modules.slow_queries import slow_queries
+    slow_queries.init_app(app)
+
+    # Prometheus request, pool and cache metrics, served at /metrics
+    from .modules.metrics import request_metrics
+    request_metrics.init_app(app)
+
     # Enable CORS for all routes
     CORS(app)
 
@@ -60,6 +87,7 @@ def create_app():
             SECRET_KEY=os.getenv("SECRET_KEY"),
             DEBUG=os.getenv("DEBUG", True),
             SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            BULK_MAX_IDS=int(os.getenv("BULK_MAX_IDS", 200)),
         )
         register_extensions(app)
 
@@ -68,13 +96,17 @@ def create_app():
         from flask_app.routes.api import api
         from flask_app.routes.auth import auth
         from flask_app.routes.favorites import favorites
+        from flask_app.routes.admin import admin
+        from flask_app.routes.metrics import metrics
 
         app.register_blueprint(views)
         app.register_blueprint(api)
         app.register_blueprint(auth)
         app.register_blueprint(favorites)
+        app.register_blueprint(admin)
+        app.register_blueprint(metrics)
 
         # Import commands here so they register with the app context
-        from .commands import books
+        from .commands import books, bench
 
         return app
@@ -0,0 +1,184 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import any_
+from sqlalchemy.dialects.postgresql import ARRAY
+from flask_app.models import Audiobook, db, AUDIOBOOK_LIST_FIELDS
+from flask_app.modules.projection import projection_options
+from flask_app.modules.serialize import audiobook_dicts_in_order
+from flask_app.modules.suggest import SuggestIndex, KINDS
+from flask_app.modules.seen_videos import build_filter, SEEN_FILTER_KINDS
+import random
+import string
+import time
+import tracemalloc
+import click
+
+
+def _time_per_call(func, iterations):
+    """Runs func `iterations` times and returns the mean wall time in ms."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - started) * 1000 / iterations
+
+
+def _load_audiobooks_in_order(ids, fields=None):
+    """
+    Loads Audiobook instances for the given IDs, preserving the ID order.
+    This is the ORM path list endpoints used before audiobook_dicts_in_order,
+    kept here as the baseline bench_serialization compares against.
+    """
+    id_array = db.bindparam("ids", list(ids), type_=ARRAY(db.Integer))
+    stmt = db.select(Audiobook).where(Audiobook.id == any_(id_array))
+    if fields:
+        stmt = stmt.options(*projection_options(fields))
+    audiobooks = db.session.execute(stmt).unique().scalars().all()
+    by_id = {audiobook.id: audiobook for audiobook in audiobooks}
+    return [by_id[audiobook_id] for audiobook_id in ids if audiobook_id in by_id]
+
+
+@current_app.cli.command("bench_serialization")
+@click.option("--per-page", default=50, help="Audiobooks serialized per call.")
+@click.option("--iterations", default=200, help="Calls timed per path.")
+@with_appcontext
+def bench_serialization(per_page, iterations):
+    """Compare the ORM and Core serialization paths used by list endpoints."""
+    ids = (
+        db.session.execute(
+            db.select(Audiobook.id).order_by(Audiobook.shuffle_key).limit(per_page)
+        )
+        .scalars()
+        .all()
+    )
+    if not ids:
+        print("No audiobooks to serialize.")
+        return
+
+    def orm_path(fields):
+        audiobooks = _load_audiobooks_in_order(ids, fields)
+        body = current_app.json.dumps(
+            {"audiobooks": [audiobook.to_dict(fields) for audiobook in audiobooks]}
+        )
+        # Start each call from an empty identity map, as a request would
+        db.session.expunge_all()
+        return body
+
+    def core_path(fields):
+        body = current_app.json.dumps(
+            {"audiobooks": audiobook_dicts_in_order(ids, fields)}
+        )
+        db.session.expunge_all()
+        return body
+
+    print(f"Serializing {len(ids)} audiobooks, {iterations} iterations per path")
+    for label, fields in (("list", AUDIOBOOK_LIST_FIELDS), ("full", None)):
+        if orm_path(fields) != core_path(fields):
+            print(f"\tWarning: {label} payloads differ between the ORM and Core paths")
+
+        orm_ms = _time_per_call(lambda: orm_path(fields), iterations)
+        core_ms = _time_per_call(lambda: core_path(fields), iterations)
+        print(
+            f"{label:>5}: ORM {orm_ms:.2f} ms, Core {core_ms:.2f} ms "
+            f"({orm_ms / core_ms:.1f}x)"
+        )
+
+
+@current_app.cli.command("bench_suggest")
+@click.option("--entries", default=1000000, help="Synthetic titles and authors to index.")
+@click.option("--lookups", default=10000, help="Prefix lookups timed.")
+@with_appcontext
+def bench_suggest(entries, lookups):
+    """Measure the suggest index's memory footprint and lookup latency."""
+    rng = random.Random(0)
+    words = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(20000)]
+
+    def label():
+        return " ".join(rng.choice(words).capitalize() for _ in range(rng.randint(1, 5)))
+
+    # Entries are generated while the index consumes them, so the traced
+    # memory is the index alone (labels included) rather than the index
+    # plus a source list that would be freed in a real build
+    synthetic = (
+        (label(), rng.randrange(len(KINDS)), i, int(rng.paretovariate(1.2)))
+        for i in range(entries)
+    )
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    index = SuggestIndex.from_entries(synthetic)
+    build_seconds = time.perf_counter() - started
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # The refresher warms single-character prefixes before serving an index
+    index.warm()
+
+    prefixes = [
+        rng.choice(index.keys)[: rng.randint(1, 8)] for _ in range(lookups)
+    ]
+    started = time.perf_counter()
+    for prefix in prefixes:
+        index.search(prefix)
+    per_lookup_us = (time.perf_counter() - started) * 1000000 / lookups
+
+    # Long prefixes bypass the memo, so time them separately as well
+    long_prefixes = [p for p in prefixes if len(p) > 3] or prefixes
+    started = time.perf_counter()
+    for prefix in long_prefixes:
+        index.search(prefix)
+    long_us = (time.perf_counter() - started) * 1000000 / len(long_prefixes)
+
+    print(f"Indexed {entries} entries ({len(index)} keys) in {build_seconds:.1f} s")
+    print(f"Index memory: {size / 1024 / 1024:.1f} MiB")
+    print(f"Lookup: {per_lookup_us:.1f} us mean, {long_us:.1f} us for prefixes over 3 chars")
+
+
+@current_app.cli.command("bench_seen_videos")
+@click.option("--ids", "id_count", default=10000000, help="Synthetic video IDs loaded.")
+@click.option("--lookups", default=100000, help="Lookups timed per filter.")
+@click.option("--kinds", default=",".join(SEEN_FILTER_KINDS), help="Filters to compare.")
+@click.option("--fp-rate", default=0.001, help="Bloom filter false-positive rate.")
+@with_appcontext
+def bench_seen_videos(id_count, lookups, kinds, fp_rate):
+    """Measure seen-video filter memory, build time and lookup latency."""
+    alphabet = string.ascii_letters + string.digits + "-_"
+    rng = random.Random(0)
+
+    def video_ids(seed, count):
+        # YouTube-style 11 character IDs, regenerated on demand rather than
+        # held in a list so they do not count towards the filter's memory
+        ids_rng = random.Random(seed)
+        for _ in range(count):
+            yield "".join(ids_rng.choices(alphabet, k=11))
+
+    step = max(id_count // lookups, 1)
+    known = [
+        video_id for i, video_id in enumerate(video_ids(1, id_count)) if i % step == 0
+    ][:lookups]
+    unknown = list(video_ids(2, lookups))
+    rng.shuffle(known)
+
+    print(f"{id_count} IDs, {lookups} lookups per filter")
+    for kind in kinds.split(","):
+        tracemalloc.start()
+        started = time.perf_counter()
+        seen = build_filter(kind, video_ids(1, id_count), id_count, fp_rate)
+        build_seconds = time.perf_counter() - started
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        misses = sum(1 for video_id in known if video_id not in seen)
+        hit_us = (time.perf_counter() - started) * 1000000 / len(known)
+        started = time.perf_counter()
+        false_positives = sum(1 for video_id in unknown if video_id in seen)
+        miss_us = (time.perf_counter() - started) * 1000000 / len(unknown)
+
+        print(
+            f"{kind:>6}: {size / 1024 / 1024:.1f} MiB "
+            f"(peak {peak / 1024 / 1024:.1f} MiB, {size / id_count:.1f} B/ID), "
+            f"built in {build_seconds:.1f} s, "
+            f"lookup {hit_us:.2f} us seen / {miss_us:.2f} us new, "
+            f"{misses} missed, {false_positives / len(unknown):.4%} false positives"
+        )
+        del seen
+
@@ -2,6 +2,10 @@ from flask import current_app
 from flask.cli import with_appcontext
 from flask_app.modules.youtube_crawler import crawl_youtube
 from flask_app.models import Category, Author, Audiobook, db, audiobook_categories
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.homepage import HomepageSnapshot, snapshot_path
+from flask_app.modules.seen_videos import seen_videos
+from flask_app.modules.name_ids import author_ids, category_ids
 import random
 from sqlalchemy import func, text
 from curl_cffi import requests
@@ -9,6 +13,19 @@ import logging
 import click
 
 
+def load_crawl_state():
+    """
+    Loads what a crawl checks against before it starts: the known video
+    IDs and the author and category name -> id caches, so the first books
+    stored do not pay for loading them.
+    """
+    seen_videos.load()
+    author_ids.warm()
+    category_ids.warm()
+    db.session.close()
+    print(f"Loaded {len(author_ids.ids)} authors and {len(category_ids.ids)} categories")
+
+
 @current_app.cli.command("add_books_full")
 @with_appcontext
 def add_books_full():
@@ -25,6 +42,7 @@ def add_books_full():
 @with_appcontext
 def add_author(author_name):
     """Crawl YouTube for audiobooks by a specific author."""
+    load_crawl_state()
     print(f"Crawling YouTube for author: {author_name}")
     crawl_youtube(f'intitle:"audiobook" {author_name}', 3)
 
@@ -32,6 +50,9 @@ def add_author(author_name):
 @current_app.cli.command("add_books_by_author")
 @with_appcontext
 def add_books_by_authors():
+    # Known video IDs, so repeats found by every author's crawl are
+    # rejected in memory
+    load_crawl_state()
 
     # Get all authors from the database
     authors = Author.query.with_entities(Author.name).all()
@@ -54,6 +75,8 @@ def add_books_by_authors():
 @current_app.cli.command("add_books_by_category")
 @with_appcontext
 def add_books_by_category():
+    load_crawl_state()
+
     # Get all categories from the database
     categories = Category.query.with_entities(Category.name).all()
 
@@ -71,6 +94,7 @@ def add_books_by_category():
 @current_app.cli.command("add_books")
 @with_appcontext
 def update_books():
+    load_crawl_state()
     crawl_youtube(f'intitle:"audiobook"')
     ctx = click.get_current_context()
     ctx.invoke(dedupe_books)
@@ -129,6 +153,9 @@ def dedupe_books():
             db.session.rollback()
             print(f"Error processing group with title '{title}': {str(e)}")
 
+    if total_deleted:
+        catalog_cache.bump_generation()
+
     print(
         f"Deduplication complete. Found {len(duplicate_groups)} duplicate groups with {total_duplicates} total records."
     )
@@ -220,6 +247,9 @@ def prune_books():
             print(f"Error checking audiobook ID {audiobook.id}: {str(e)}")
             error_count += 1
 
+    if deleted_count:
+        catalog_cache.bump_generation()
+
     print("\nPruning complete. Summary:")
     print(f"Total audiobooks checked: {total_count}")
     print(f"Available audiobooks: {available_count}")
@@ -252,5 +282,23 @@ def set_category_sort_order():
 
     # Commit all changes
     db.session.commit()
+    catalog_cache.bump_generation()
 
     print(f"Successfully updated sort_order for {total_count} categories")
+
+
+@current_app.cli.command("build_homepage")
+@with_appcontext
+def build_homepage():
+    """
+    Build the homepage bundle and write it where the web workers load it.
+    Run after ingesting; workers also refresh it themselves when the
+    catalog changes.
+    """
+    snapshot = HomepageSnapshot.build()
+    path = snapshot_path()
+    snapshot.save(path)
+    print(
+        f"Wrote homepage snapshot to {path} "
+        f"({len(snapshot.body)} bytes, {len(snapshot.gzip_body)} gzipped)"
+    )
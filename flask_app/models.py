@@ -4,6 +4,7 @@ from datetime import datetime, date, timezone
 from flask_app.modules.extensions import db, bcrypt
 import logging
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 # Disable SQLAlchemy modification tracking globally for better performance
 db.session.configure(autoflush=False)
@@ -17,7 +18,11 @@ logging.getLogger('sqlalchemy.orm').setLevel(logging.WARNING)
 # Association table for the many-to-many relationship between Audiobooks and Categories
 audiobook_categories = db.Table('audiobook_categories',
     db.Column('audiobook_id', db.Integer, db.ForeignKey('audiobooks.id'), primary_key=True),
-    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    db.Column('category_id', db.Integer, db.ForeignKey('categories.id'), primary_key=True),
+    # Random key per link, so a category can be sampled by probing its own
+    # (category_id, shuffle_key) range instead of the whole catalog's
+    db.Column('shuffle_key', db.Float, nullable=False, server_default=db.text("random()")),
+    db.Index('ix_audiobook_categories_category_shuffle', 'category_id', 'shuffle_key', 'audiobook_id'),
 )
 
 # Association table for the many-to-many relationship between Users and Audiobooks (favorites)
@@ -58,6 +63,16 @@ class Author(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), unique=True, nullable=False, index=True)
 
+    __table_args__ = (
+        # Trigram index for typo-tolerant author lookups (requires pg_trgm)
+        db.Index(
+            "ix_authors_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"},
+        ),
+    )
+
     # Relationship back to Audiobooks (one-to-many)
     audiobooks = db.relationship(
         'Audiobook',
@@ -99,6 +114,22 @@ class SkippedVideo(db.Model):
         }
 
 
+# Every key Audiobook.to_dict can produce, and the compact subset list
+# endpoints return by default (the description is only shown on detail views)
+AUDIOBOOK_FIELDS = (
+    "id",
+    "video_id",
+    "title",
+    "description",
+    "thumbnail",
+    "author",
+    "categories",
+    "duration",
+    "timestamp",
+)
+AUDIOBOOK_LIST_FIELDS = tuple(f for f in AUDIOBOOK_FIELDS if f != "description")
+
+
 class Audiobook(db.Model):
     """Represents an audiobook entry in the database, linking YouTube video and Google Books data."""
 
@@ -115,7 +146,7 @@ class Audiobook(db.Model):
     thumbnail = db.Column(db.String(524), nullable=True)  # Renamed from yt_thumbnail, increased length
 
     # Author (Foreign Key and Relationship)
-    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=True, index=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('authors.id'), nullable=True)
     author = db.relationship('Author', back_populates='audiobooks', lazy='joined') # Use joined loading
 
     # Categories (Many-to-Many relationship)
@@ -123,39 +154,75 @@ class Audiobook(db.Model):
         'Category',
         secondary=audiobook_categories,
         back_populates='audiobooks',
+        order_by='Category.id',
         lazy='joined' # Use joined loading for efficiency when accessing categories
     )
 
+    # Precomputed random sort key for seeded shuffle pagination; the
+    # (shuffle_key, id) index turns shuffled page fetches into range scans
+    shuffle_key = db.Column(
+        db.Float, nullable=False, server_default=db.text("random()")
+    )
+
+    # Weighted full-text document (title > author > description), maintained
+    # by the audiobooks_search_vector_update trigger; deferred so it is never
+    # loaded with the row
+    search_vector = db.deferred(db.Column(TSVECTOR, nullable=True))
+
     # Metadata
     duration = db.Column(
         db.Integer, nullable=True
     )  # Duration in seconds (if available from YT)
     # Use timezone.utc for compatibility
     timestamp = db.Column(
-        db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+        db.DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
     )  # When record was added/updated
 
+    __table_args__ = (
+        db.Index("ix_audiobooks_shuffle_key_id", "shuffle_key", "id"),
+        # Serves author lookups and keyset pages through an author's books
+        db.Index("ix_audiobooks_author_id_id", "author_id", "id"),
+        db.Index(
+            "ix_audiobooks_search_vector", "search_vector", postgresql_using="gin"
+        ),
+        db.Index(
+            "ix_audiobooks_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+    )
+
     def __repr__(self):
         """Provide a helpful representation when printing the object."""
         return f'<Audiobook {self.id}: "{self.title}" (Video ID: {self.video_id})>'
 
-    def to_dict(self):
-        """Convert the Audiobook object to a dictionary for JSON serialization."""
-        return {
-            "id": self.id,
-            "video_id": self.video_id,
-            "title": self.title,
-            "description": self.description,
-            "thumbnail": self.thumbnail,
-            "author": self.author.name if self.author else None, # Access name via relationship
-            "categories": [category.name for category in self.categories], # List of category names
-            "duration": self.duration,
-            "timestamp": (
+    def to_dict(self, fields=None):
+        """Convert the Audiobook object to a dictionary for JSON serialization.
+
+        Args:
+            fields (iterable): Optional subset of AUDIOBOOK_FIELDS to include.
+                Attributes outside it are never touched, so columns deferred
+                by a projection are not lazy-loaded.
+        """
+        getters = {
+            "id": lambda: self.id,
+            "video_id": lambda: self.video_id,
+            "title": lambda: self.title,
+            "description": lambda: self.description,
+            "thumbnail": lambda: self.thumbnail,
+            "author": lambda: self.author.name if self.author else None, # Access name via relationship
+            "categories": lambda: [category.name for category in self.categories], # List of category names
+            "duration": lambda: self.duration,
+            "timestamp": lambda: (
                 self.timestamp.isoformat()
                 if isinstance(self.timestamp, datetime)
                 else None
             ),
         }
+        return {name: getters[name]() for name in (fields or AUDIOBOOK_FIELDS)}
 
 
 class YoutubeSearchState(db.Model):
@@ -0,0 +1,97 @@
+from sqlalchemy import func
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook, Author
+
+
+def _with_book_counts(authors, order_by):
+    # Joins a bounded set of authors to their audiobooks and counts them in
+    # one grouped statement; each count is an index range on author_id
+    return (
+        db.select(
+            authors.c.id,
+            authors.c.name,
+            func.count(Audiobook.id).label("books"),
+        )
+        .select_from(authors)
+        .outerjoin(Audiobook, Audiobook.author_id == authors.c.id)
+        .group_by(authors.c.id, authors.c.name)
+        .order_by(*order_by)
+    )
+
+
+def author_page(per_page, after_name=None):
+    """
+    Fetches one page of authors in name order, with their book counts.
+
+    The page is a keyset range on the unique name index (name > :after),
+    so deep pages cost the same as the first one.
+
+    Args:
+        per_page (int): Page size.
+        after_name (str): Last name of the previous page, or None.
+
+    Returns:
+        tuple: (authors, has_next) where authors are dicts with id, name
+               and books.
+    """
+    page = db.select(Author.id, Author.name)
+    if after_name is not None:
+        page = page.where(Author.name > after_name)
+    page = page.order_by(Author.name).limit(per_page + 1).subquery()
+
+    rows = db.session.execute(_with_book_counts(page, [page.c.name])).all()
+    has_next = len(rows) > per_page
+    return [row._asdict() for row in rows[:per_page]], has_next
+
+
+def top_authors(limit):
+    """
+    Returns the authors with the most audiobooks. This aggregates the whole
+    catalog, so callers cache the result per catalog generation.
+
+    Args:
+        limit (int): Number of authors.
+
+    Returns:
+        list: Dicts with id, name and books, most books first.
+    """
+    ranked = (
+        db.select(Audiobook.author_id.label("id"), func.count().label("books"))
+        .where(Audiobook.author_id.is_not(None))
+        .group_by(Audiobook.author_id)
+        .order_by(func.count().desc(), Audiobook.author_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(Author.id, Author.name, ranked.c.books)
+        .join(ranked, ranked.c.id == Author.id)
+        .order_by(ranked.c.books.desc(), Author.name)
+    ).all()
+    return [row._asdict() for row in rows]
+
+
+def author_audiobook_ids(author_id, per_page, after_id=0):
+    """
+    Fetches one page of an author's audiobook IDs in id order, walking the
+    (author_id, id) index from after_id.
+
+    Args:
+        author_id (int): The author.
+        per_page (int): Page size.
+        after_id (int): Last id of the previous page.
+
+    Returns:
+        tuple: (ids, has_next)
+    """
+    ids = (
+        db.session.execute(
+            db.select(Audiobook.id)
+            .where(Audiobook.author_id == author_id, Audiobook.id > after_id)
+            .order_by(Audiobook.id)
+            .limit(per_page + 1)
+        )
+        .scalars()
+        .all()
+    )
+    return ids[:per_page], len(ids) > per_page
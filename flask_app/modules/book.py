@@ -7,116 +7,123 @@ from flask_app.modules.helpers import (
 from datetime import timedelta # Added import
 from flask_app.modules.extensions import db
 from sqlalchemy.exc import SQLAlchemyError
-from flask_app.models import Audiobook, SkippedVideo, Category, Author # Added Author import
+from flask_app.models import SkippedVideo
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.bulk_writer import (
+    books_stored,
+    bulk_writer,
+    videos_skipped,
+    write_books,
+)
+from flask_app.modules.name_ids import author_ids, category_ids
+
+
+# SQLSTATE for a foreign key violation, e.g. a cached author id whose row
+# has since been deleted
+FOREIGN_KEY_VIOLATION = "23503"
 
 
-# Modify store_book_info to use the updated Audiobook model
 def store_book_info(book_data):
     """
-    Stores the processed book data into the database using SQLAlchemy,
-    checking for duplicate video_id.
+    Stores the processed book data into the database, checking for
+    duplicate video_id.
+
+    Author and category ids come from the name -> id caches, so a book whose
+    author and categories already exist costs two statements: the book
+    and its category links. New names are created with ON CONFLICT upserts,
+    which makes concurrent ingesters safe.
+
+    While a crawl has the bulk writer started, the book is only buffered
+    and written with the next batch.
 
     Args:
         book_data (dict): A dictionary containing the processed book details
                           (video_id, title, description, thumbnail, author, categories, duration).
 
     Returns:
-        bool: True if the book was added, False otherwise.
+        bool: True if the book was added (or buffered), False otherwise.
     """
-    try:
-        video_id = book_data.get("video_id")
-        if not video_id:
-            print("\tError: Missing video_id in book data.")
+    video_id = book_data.get("video_id")
+    if not video_id:
+        print("\tError: Missing video_id in book data.")
+        return False
+
+    if bulk_writer.active:
+        bulk_writer.add_book(book_data)
+        return True
+
+    for attempt in range(2):
+        try:
+            if not write_books([dict(book_data)]):
+                db.session.rollback()
+                author_ids.discard()
+                category_ids.discard()
+                print(f"Video ID {video_id} already exists in the database.")
+                return False
+
+            db.session.commit()
+            author_ids.publish()
+            category_ids.publish()
+            break
+        except SQLAlchemyError as e:
+            db.session.rollback()  # Rollback transaction on error
+            author_ids.discard()
+            category_ids.discard()
+            pgcode = getattr(getattr(e, "orig", None), "pgcode", None)
+            if attempt == 0 and pgcode == FOREIGN_KEY_VIOLATION:
+                # A cached id went stale; reload the caches and try once more
+                author_ids.clear()
+                category_ids.clear()
+                continue
+            print(f"Error storing book for video ID '{video_id}': {e}")
             return False
 
-        # --- Create new Audiobook object ---
-        new_audiobook = Audiobook(
-            video_id=video_id,
-            title=book_data.get("title"),
-            description=book_data.get("description"),
-            thumbnail=book_data.get("thumbnail"),
-            # author=book_data.get("author"), # Author is now handled via relationship
-            duration=book_data.get("duration"),
-            # timestamp is handled by the model default
-        )
+    catalog_cache.bump_generation()
+    books_stored([book_data])
+    return True
 
-        # --- Handle Author ---
-        author_name = book_data.get("author")
-        author_instance = None
-        if author_name:
-            # Find existing author or create a new one
-            author_instance = db.session.execute(
-                db.select(Author).filter_by(name=author_name)
-            ).scalar_one_or_none()
-            if not author_instance:
-                author_instance = Author(name=author_name)
-                db.session.add(author_instance)
-                # Flush to get the author ID if needed immediately, or commit handles it
-                # db.session.flush()
-            # Associate the author with the audiobook
-            new_audiobook.author = author_instance
-        # --- End Handle Author ---
-
-
-        # Add the audiobook to the session BEFORE handling categories
-        db.session.add(new_audiobook)
-
-        # --- Handle Categories ---
-        category_names = book_data.get("categories", [])
-        if category_names:
-            for cat_name in category_names:
-                # Find existing category or create a new one
-                category = db.session.execute(
-                    db.select(Category).filter_by(name=cat_name)
-                ).scalar_one_or_none()
-                if not category:
-                    category = Category(name=cat_name)
-                    db.session.add(category)
-                    # Flush to get the category ID if needed, or commit handles it
-                    # db.session.flush()
-                # Append the category object to the audiobook's categories list
-                if category not in new_audiobook.categories:
-                    new_audiobook.categories.append(category)
-        # --- End Handle Categories ---
-
-        # Commit the session (includes audiobook and any new categories)
-        db.session.commit()
-        duration_msg = (
-            f"(Duration: {new_audiobook.duration}s)"
-            if new_audiobook.duration is not None
-            else "(Duration: Unknown)"
-        )
-        author_display = new_audiobook.author.name if new_audiobook.author else "Unknown"
-        print(f"Stored: Title '{new_audiobook.title}' Author: {author_display}")
-        return True
 
-    except Exception as e:  # Catch potential DB errors or other issues
-        db.session.rollback()  # Rollback transaction on error
-        print(f"Error storing book for video ID '{video_id}': {e}")
-        return False
+# Video IDs already stored as audiobooks or skipped, in one round trip;
+# both sides are lookups on the unique video_id indexes
+EXISTING_VIDEO_IDS_SQL = db.text("""
+    SELECT video_id FROM audiobooks WHERE video_id = ANY(:ids)
+    UNION ALL
+    SELECT video_id FROM skipped_videos WHERE video_id = ANY(:ids)
+""")
 
 
-def check_if_book_exists(video_id):
-    # Use .unique() because Audiobook uses joined eager loading for categories
-    found = (
-        db.session.execute(db.select(Audiobook).filter_by(video_id=video_id))
-        .unique()
-        .scalar_one_or_none()
+def existing_video_ids(video_ids):
+    """
+    Finds which of the given videos are already known, as audiobooks or as
+    skipped videos.
+
+    Args:
+        video_ids (list): YouTube video IDs, e.g. one scroll batch.
+
+    Returns:
+        set: The IDs that are already in the database.
+    """
+    video_ids = list(video_ids)
+    if not video_ids:
+        return set()
+    return set(
+        db.session.execute(EXISTING_VIDEO_IDS_SQL, {"ids": video_ids}).scalars()
     )
 
-    if not found:
-        # Check if the video is in the skipped videos table
-        found = db.session.execute(
-            db.select(SkippedVideo).filter_by(video_id=video_id)
-        ).scalar_one_or_none()
 
-    return found
+def check_if_book_exists(video_id):
+    return video_id in existing_video_ids([video_id])
 
 
 def ineligible_video(video_id, reason):
     """
-    Store the ineligible video in the database
+    Store the ineligible video in the database, or buffer it while the
+    bulk writer is started
     """
+    if bulk_writer.active:
+        bulk_writer.add_skip(video_id, reason)
+        return True
+
     try:
         # Let the database handle the timestamp via server_default
         new_skipped_video = SkippedVideo(
@@ -130,7 +137,7 @@ def ineligible_video(video_id, reason):
         print(f"\tError storing skipped video '{video_id}': {e}")
         return False
 
-    print(f"\tSkipped: {video_id} - {reason}")
+    videos_skipped([(video_id, reason)])
     return True
 
 
@@ -0,0 +1,327 @@
+import os
+import threading
+import time
+from collections import Counter
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook, SkippedVideo, audiobook_categories
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.metrics import BOOKS_STORED, VIDEOS_SKIPPED, WRITES_FAILED
+from flask_app.modules.name_ids import author_ids, category_ids
+from flask_app.modules.seen_videos import seen_videos
+
+
+def insert_audiobooks(books):
+    """
+    Inserts audiobooks in one multi-row statement. Videos that are already
+    stored, possibly by another worker, are left alone.
+
+    Args:
+        books (list): Book dicts with video_id, title, description,
+                      thumbnail, duration and a resolved author_id.
+
+    Returns:
+        dict: video_id -> new audiobook id, for the rows actually inserted.
+    """
+    if not books:
+        return {}
+    table = Audiobook.__table__
+    rows = db.session.execute(
+        insert(table)
+        .values(
+            [
+                {
+                    "video_id": book["video_id"],
+                    "title": book.get("title"),
+                    "description": book.get("description"),
+                    "thumbnail": book.get("thumbnail"),
+                    "author_id": book.get("author_id"),
+                    "duration": book.get("duration"),
+                }
+                for book in books
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=["video_id"])
+        .returning(table.c.video_id, table.c.id)
+    ).all()
+    return dict(rows)
+
+
+def insert_category_links(links):
+    """Inserts (audiobook_id, category_id) pairs in one statement."""
+    if links:
+        db.session.execute(
+            insert(audiobook_categories)
+            .values(
+                [
+                    {"audiobook_id": audiobook_id, "category_id": category_id}
+                    for audiobook_id, category_id in links
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+
+
+def insert_skipped_videos(skips):
+    """Inserts (video_id, reason) pairs in one statement, ignoring known videos."""
+    if skips:
+        db.session.execute(
+            insert(SkippedVideo.__table__)
+            .values([{"video_id": video_id, "reason": reason} for video_id, reason in skips])
+            .on_conflict_do_nothing(index_elements=["video_id"])
+        )
+
+
+def resolve_names(books):
+    """Sets author_id and category_ids on each book from the name caches."""
+    authors = author_ids.ids_for(book.get("author") for book in books)
+    categories = category_ids.ids_for(
+        name for book in books for name in book.get("categories") or []
+    )
+    for book in books:
+        book["author_id"] = authors.get(book.get("author"))
+        book["category_ids"] = list(
+            dict.fromkeys(
+                categories[name] for name in book.get("categories") or [] if name
+            )
+        )
+
+
+def write_books(books):
+    """
+    Writes books and their category links in the current transaction.
+
+    Returns:
+        list: The books that were inserted (the others were duplicates).
+    """
+    resolve_names(books)
+    inserted = insert_audiobooks(books)
+    insert_category_links(
+        [
+            (inserted[book["video_id"]], category_id)
+            for book in books
+            if book["video_id"] in inserted
+            for category_id in book["category_ids"]
+        ]
+    )
+    return [book for book in books if book["video_id"] in inserted]
+
+
+def books_stored(books):
+    """Bookkeeping after books are committed."""
+    for book in books:
+        BOOKS_STORED.inc()
+        seen_videos.add(book["video_id"])
+        print(f"Stored: Title '{book.get('title')}' Author: {book.get('author') or 'Unknown'}")
+
+
+def videos_skipped(skips):
+    """Bookkeeping after skipped videos are committed."""
+    for video_id, reason in skips:
+        VIDEOS_SKIPPED.labels(reason).inc()
+        seen_videos.add(video_id)
+        print(f"\tSkipped: {video_id} - {reason}")
+
+
+class BulkWriter:
+    """
+    Buffers accepted books and skipped videos during a crawl and writes
+    them in batches: one transaction per flush, with multi-row inserts for
+    audiobooks, category links and skipped videos, instead of a commit per
+    video.
+
+    add_book() and add_skip() only buffer, so any stage can call them
+    without doing database work. Only the store stage flushes, through
+    flush_if_due() after each book and while idle: once BULK_WRITE_SIZE
+    videos are buffered or the oldest has waited BULK_WRITE_SECONDS. close()
+    writes the rest.
+
+    If a batch fails on a row, it is rolled back and rewritten row by row,
+    each row in its own savepoint, so one bad row only loses itself. If it
+    fails on the connection or the commit, its rows go back into the buffer
+    for the next flush, up to BULK_WRITE_ATTEMPTS times. Rows that are given
+    up on are printed and counted in WRITES_FAILED.
+
+    While the writer is not started, store_book_info and ineligible_video
+    write directly as before.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.stats = Counter()
+        self._books = []
+        self._skips = []
+        self._oldest = None
+        self._attempts = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def start(self):
+        self.batch_size = int(os.getenv("BULK_WRITE_SIZE", 100))
+        self.max_wait = float(os.getenv("BULK_WRITE_SECONDS", 10))
+        self.max_attempts = max(int(os.getenv("BULK_WRITE_ATTEMPTS", 3)), 1)
+        self.stats.clear()
+        self.active = True
+
+    def close(self):
+        """
+        Writes whatever is buffered, retrying failed batches, and goes back
+        to direct writes.
+        """
+        while self.pending():
+            self.flush()
+            if self.pending():
+                time.sleep(1)
+        self.active = False
+        print(
+            f"Bulk writer: {self.stats['books']} books and {self.stats['skips']}"
+            f" skipped videos written, {self.stats['failed']} failed"
+        )
+
+    def pending(self):
+        """Number of buffered books and skipped videos."""
+        with self._buffer_lock:
+            return len(self._books) + len(self._skips)
+
+    def add_book(self, book_data):
+        self._add(self._books, dict(book_data))
+
+    def add_skip(self, video_id, reason):
+        self._add(self._skips, (video_id, reason))
+
+    def _add(self, buffer, item):
+        with self._buffer_lock:
+            buffer.append(item)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def flush_if_due(self):
+        """Flushes if the size or time threshold has been reached."""
+        with self._buffer_lock:
+            pending = len(self._books) + len(self._skips)
+            due = pending and (
+                pending >= self.batch_size
+                or time.monotonic() - self._oldest >= self.max_wait
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered books and skipped videos."""
+        with self._flush_lock:
+            with self._buffer_lock:
+                books, self._books = self._books, []
+                skips, self._skips = self._skips, []
+                self._oldest = None
+            if not books and not skips:
+                return
+
+            try:
+                stored, written_skips, failed = self._write_batch(books, skips)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                author_ids.discard()
+                category_ids.discard()
+                self._retry(books, skips, e)
+                return
+
+            for book in books:
+                self._attempts.pop(book["video_id"], None)
+            for video_id, _ in skips:
+                self._attempts.pop(video_id, None)
+            if stored:
+                catalog_cache.bump_generation()
+            books_stored(stored)
+            videos_skipped(written_skips)
+            for kind, video_id, error in failed:
+                self._failed(kind, video_id, error)
+            self.stats["books"] += len(stored)
+            self.stats["skips"] += len(written_skips)
+            print(
+                f"Flushed {len(stored)} books and {len(written_skips)} skipped videos"
+            )
+
+    def _write_batch(self, books, skips):
+        # Connection errors and failed commits propagate, and the caller
+        # keeps the rows for another attempt
+        failed = []
+        try:
+            stored = write_books(books)
+            insert_skipped_videos(skips)
+            db.session.commit()
+        except OperationalError:
+            raise
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            author_ids.discard()
+            category_ids.discard()
+            print(f"\tWarning: Batch write failed, retrying row by row: {e}")
+            stored, skips, failed = self._write_rows(books, skips)
+        author_ids.publish()
+        category_ids.publish()
+        return stored, skips, failed
+
+    def _write_rows(self, books, skips):
+        # Clear the caches first: the batch may have failed on a stale id
+        author_ids.clear()
+        category_ids.clear()
+        stored = []
+        written_skips = []
+        # Reported once the commit succeeds; if it fails, the whole batch
+        # is tried again
+        failed = []
+        for book in books:
+            try:
+                with db.session.begin_nested():
+                    stored.extend(write_books([book]))
+            except OperationalError:
+                raise
+            except SQLAlchemyError as e:
+                # Ids created inside the rolled back savepoint are gone
+                author_ids.discard()
+                category_ids.discard()
+                failed.append(("book", book["video_id"], e))
+        for video_id, reason in skips:
+            try:
+                with db.session.begin_nested():
+                    insert_skipped_videos([(video_id, reason)])
+                written_skips.append((video_id, reason))
+            except OperationalError:
+                raise
+            except SQLAlchemyError as e:
+                failed.append(("skip", video_id, e))
+        db.session.commit()
+        return stored, written_skips, failed
+
+    def _retry(self, books, skips, error):
+        """Puts a failed batch back in the buffer, dropping rows out of attempts."""
+
+        def keep(kind, video_id):
+            attempts = self._attempts.get(video_id, 0) + 1
+            if attempts < self.max_attempts:
+                self._attempts[video_id] = attempts
+                return True
+            self._attempts.pop(video_id, None)
+            self._failed(kind, video_id, error)
+            return False
+
+        books = [book for book in books if keep("book", book["video_id"])]
+        skips = [skip for skip in skips if keep("skip", skip[0])]
+        with self._buffer_lock:
+            self._books[:0] = books
+            self._skips[:0] = skips
+            if self._oldest is None and (books or skips):
+                self._oldest = time.monotonic()
+        print(
+            f"\tWarning: Batch write failed, {len(books) + len(skips)} rows kept"
+            f" for the next flush: {error}"
+        )
+
+    def _failed(self, kind, video_id, error):
+        self.stats["failed"] += 1
+        WRITES_FAILED.labels(kind).inc()
+        print(f"\tError storing {kind} for video ID '{video_id}': {error}")
+
+
+bulk_writer = BulkWriter()
@@ -0,0 +1,292 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from flask_app.modules.extensions import db
+
+GENERATION_KEY = "catalog:generation"
+
+# Redis key prefix for the primary's WAL position just after each bump
+GENERATION_LSN_KEY = "catalog:generation_lsn"
+
+# The primary's WAL position in bytes, comparable with a replica's replay
+# position (see routing.replica_caught_up)
+CURRENT_LSN_SQL = "SELECT pg_current_wal_lsn() - '0/0'::pg_lsn"
+
+
+class LRUCacheBackend:
+    """
+    In-process LRU cache with per-entry expiry. Only suitable for a single
+    worker process; other processes never see its entries.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """
+    Cache stored in any Redis-protocol server (Redis, Valkey, KeyDB or a
+    local stand-in), shared by every worker and CLI process pointed at it.
+    """
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def clear(self):
+        self.client.flushdb()
+
+
+class CatalogCache:
+    """
+    Response cache for catalog-level data, keyed by a catalog generation
+    number. Every write to the catalog bumps the generation, so entries
+    written under an older generation are simply never read again.
+
+    The generation lives in Redis when the Redis backend is used. Otherwise
+    it lives in the catalog_generation Postgres sequence, which the ingest
+    CLI commands can bump from another process; each process re-reads it at
+    most every CACHE_GENERATION_POLL_SECONDS.
+
+    Each generation comes with a WAL position of the primary that includes
+    every write made before it was bumped. A request reading from a replica
+    pins the generation (see pin_generation) and only uses a replica that
+    has replayed that far, so nothing read from a lagging replica is cached
+    or ETagged under a newer generation.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.default_ttl = None
+        self.poll_seconds = 0
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+        self._generation = None
+        self._generation_lsn = None
+        self._generation_read_at = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = os.getenv("CACHE_BACKEND", "lru").lower()
+        if backend == "redis":
+            self.backend = RedisCacheBackend(
+                os.getenv("CACHE_REDIS_URL", "redis://redis:6379/0")
+            )
+        elif backend == "lru":
+            self.backend = LRUCacheBackend(int(os.getenv("CACHE_MAX_ENTRIES", 1024)))
+        else:
+            self.backend = None
+        self.default_ttl = int(os.getenv("CACHE_DEFAULT_TTL", 3600))
+        self.poll_seconds = float(os.getenv("CACHE_GENERATION_POLL_SECONDS", 2))
+        app.extensions["catalog_cache"] = self
+
+    @property
+    def shared(self):
+        """True when the backend is visible to every process."""
+        return isinstance(self.backend, RedisCacheBackend)
+
+    def generation(self):
+        """Returns the current catalog generation number."""
+        if has_request_context() and "catalog_generation" in g:
+            return g.catalog_generation
+        return self._read_generation()[0]
+
+    def pin_generation(self):
+        """
+        Reads the current generation and fixes it for the rest of the
+        request, so cache keys and ETags match the data the request reads.
+
+        Returns:
+            tuple: (generation, primary WAL position in bytes)
+        """
+        generation, lsn = self._read_generation()
+        g.catalog_generation = generation
+        return generation, lsn
+
+    def _read_generation(self):
+        if self.shared:
+            generation = int(self.backend.get(GENERATION_KEY) or 0)
+            lsn_key = f"{GENERATION_LSN_KEY}:{generation}"
+            lsn = self.backend.get(lsn_key)
+            if lsn is None:
+                # Expired, or the bump is still being recorded: the current
+                # position is later than any write this generation covers
+                (lsn,) = self._sequence(CURRENT_LSN_SQL)
+                self.backend.set(lsn_key, int(lsn), self.default_ttl)
+            return generation, int(lsn)
+
+        now = time.monotonic()
+        if self._generation is None or now - self._generation_read_at > self.poll_seconds:
+            # Any bump counted in last_value came after its writes were
+            # committed, so the WAL position read with it covers them
+            generation, lsn = self._sequence(
+                "SELECT CASE WHEN is_called THEN last_value ELSE 0 END,"
+                " pg_current_wal_lsn() - '0/0'::pg_lsn"
+                " FROM catalog_generation"
+            )
+            self._generation = generation
+            self._generation_lsn = int(lsn)
+            self._generation_read_at = now
+        return self._generation, self._generation_lsn
+
+    def _sequence(self, sql):
+        # Use a connection of its own so a failure here can never abort the
+        # caller's transaction, and a bump is visible to other processes
+        # without waiting for the caller to commit
+        with db.engine.connect() as connection:
+            return connection.execute(db.text(sql)).one()
+
+    def bump_generation(self):
+        """
+        Invalidates everything cached so far. Called by every code path that
+        writes audiobooks, authors or categories.
+        """
+        try:
+            if self.shared:
+                generation = self.backend.incr(GENERATION_KEY)
+                # Read after the increment, so the position also covers
+                # every bump that got a lower number
+                (lsn,) = self._sequence(CURRENT_LSN_SQL)
+                self.backend.set(
+                    f"{GENERATION_LSN_KEY}:{generation}", int(lsn), self.default_ttl
+                )
+                self._generation = generation
+            else:
+                (self._generation,) = self._sequence(
+                    "SELECT nextval('catalog_generation')"
+                )
+                # Force the next read, which fetches the matching position
+                self._generation_read_at = 0.0
+        except Exception as e:
+            current_app.logger.warning(f"Failed to bump catalog generation: {e}")
+            return None
+        if has_request_context():
+            g.pop("catalog_generation", None)
+        return self._generation
+
+    def _key(self, key):
+        return f"catalog:{self.generation()}:{key}"
+
+    def get_or_set(self, key, creator, ttl=None):
+        """
+        Returns the cached JSON-serializable value for key under the current
+        generation, calling creator() to build and store it on a miss. A None
+        result is returned but not stored, so creators can signal "retry".
+        """
+        if self.backend is None:
+            return creator()
+
+        try:
+            full_key = self._key(key)
+            cached = self.backend.get(full_key)
+        except Exception as e:
+            current_app.logger.warning(f"Cache read failed for '{key}': {e}")
+            self.stats["errors"] += 1
+            return creator()
+
+        if cached is not None:
+            self.stats["hits"] += 1
+            return json.loads(cached)
+
+        self.stats["misses"] += 1
+        value = creator()
+        if value is None:
+            return None
+        try:
+            self.backend.set(full_key, json.dumps(value), ttl or self.default_ttl)
+        except Exception as e:
+            current_app.logger.warning(f"Cache write failed for '{key}': {e}")
+            self.stats["errors"] += 1
+        return value
+
+    def cached_view(self, name, ttl=None):
+        """
+        Decorator caching a view's successful JSON response body under the
+        current generation, keyed by the view arguments and query string.
+        """
+
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+
+                view_args = ",".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
+                key = f"view:{name}:{view_args}:{request.query_string.decode()}"
+                try:
+                    full_key = self._key(key)
+                    body = self.backend.get(full_key)
+                except Exception as e:
+                    current_app.logger.warning(f"Cache read failed for '{key}': {e}")
+                    self.stats["errors"] += 1
+                    return view(*args, **kwargs)
+
+                if body is not None:
+                    self.stats["hits"] += 1
+                    return current_app.response_class(body, mimetype="application/json")
+
+                self.stats["misses"] += 1
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and response.is_json:
+                    try:
+                        self.backend.set(
+                            full_key, response.get_data(), ttl or self.default_ttl
+                        )
+                    except Exception as e:
+                        current_app.logger.warning(f"Cache write failed for '{key}': {e}")
+                        self.stats["errors"] += 1
+                return response
+
+            return wrapper
+
+        return decorator
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,122 @@
+import json
+from flask import abort, request
+from flask_app.modules.extensions import db
+from flask_app.modules.cache import catalog_cache
+
+# How a paginated endpoint works out its total:
+#   none     - no count at all; has_next comes from fetching one extra row
+#   estimate - planner statistics (pg_class.reltuples or EXPLAIN row estimates)
+#   exact    - a real COUNT, cached per catalog generation where possible
+COUNT_MODES = ("none", "estimate", "exact")
+
+
+def count_mode(default="exact"):
+    """
+    Reads the ``count`` query parameter.
+
+    Args:
+        default (str): Mode used when the parameter is absent.
+
+    Returns:
+        str: One of COUNT_MODES. Unknown values abort with a 400.
+    """
+    mode = request.args.get("count", default)
+    if mode not in COUNT_MODES:
+        abort(400, description=f"count must be one of: {', '.join(COUNT_MODES)}")
+    return mode
+
+
+def estimate_table_rows(table_name):
+    """
+    Returns the planner's row estimate for a whole table from
+    pg_class.reltuples, which costs nothing regardless of table size.
+
+    Args:
+        table_name (str): The table name.
+
+    Returns:
+        int: The estimate, or None when the table has never been analyzed.
+    """
+    reltuples = db.session.execute(
+        db.text("SELECT reltuples FROM pg_class WHERE oid = to_regclass(:name)"),
+        {"name": table_name},
+    ).scalar()
+    if reltuples is None or reltuples < 0:
+        return None
+    return int(reltuples)
+
+
+def estimate_rows(stmt, params=None):
+    """
+    Returns the planner's row estimate for a query by running EXPLAIN on it,
+    without executing the query itself.
+
+    Args:
+        stmt: A Core select or text() statement.
+        params (dict): Values for any unbound parameters in the statement.
+
+    Returns:
+        int: The estimated number of rows the query would return.
+    """
+    compiled = stmt.compile(dialect=db.engine.dialect)
+    bound = dict(compiled.params)
+    bound.update(params or {})
+    plan = (
+        db.session.connection()
+        .exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled.string}", bound)
+        .scalar()
+    )
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def filtered_total(mode, stmt, cache_key):
+    """
+    Works out the number of rows `stmt` returns under the given count mode.
+    Exact counts are cached under cache_key until the catalog changes.
+
+    Args:
+        mode (str): One of COUNT_MODES.
+        stmt (Select): The row query to count.
+        cache_key (str): Cache key for the exact count.
+
+    Returns:
+        int: The total, or None for count=none.
+    """
+    if mode == "exact":
+        return catalog_cache.get_or_set(
+            cache_key,
+            lambda: db.session.execute(
+                db.select(db.func.count()).select_from(stmt.subquery())
+            ).scalar(),
+        )
+    if mode == "estimate":
+        return estimate_rows(stmt)
+    return None
+
+
+def pagination_info(page, per_page, total, has_next, mode):
+    """
+    Builds the ``pagination`` block shared by paginated endpoints. With
+    count=none, ``total`` and ``pages`` are null and ``has_next`` alone
+    drives infinite scroll.
+
+    Args:
+        page (int): 1-based page number, or None for cursor-paged listings.
+        per_page (int): Page size.
+        total (int): Total rows, exact or estimated, or None.
+        has_next (bool): Whether another page follows.
+        mode (str): The count mode that produced ``total``.
+
+    Returns:
+        dict: The pagination block.
+    """
+    return {
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": -(-total // per_page) if total is not None else None,
+        "has_next": has_next,
+        "count": mode,
+    }
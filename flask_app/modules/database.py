@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import g, has_request_context
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+
+def _env_flag(name, default=False):
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+def pgbouncer_mode():
+    """
+    Whether the app connects through PgBouncer in transaction pooling mode
+    (DB_PGBOUNCER). Consecutive transactions may then land on different
+    server connections, so nothing may rely on session state.
+    """
+    return _env_flag("DB_PGBOUNCER")
+
+
+def default_statement_timeout_ms():
+    """The statement_timeout for every connection, from DB_STATEMENT_TIMEOUT_MS (0 = none)."""
+    return int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+
+
+def engine_options():
+    """
+    Builds SQLALCHEMY_ENGINE_OPTIONS from the environment. They apply to the
+    primary and to every read replica bind.
+
+    Pool: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT (seconds to wait for
+    a connection), DB_POOL_RECYCLE (seconds before a connection is replaced)
+    and DB_POOL_PRE_PING. Server settings: DB_CONNECT_TIMEOUT,
+    DB_STATEMENT_TIMEOUT_MS and DB_IDLE_IN_TRANSACTION_TIMEOUT_MS.
+
+    Outside PgBouncer mode the server settings are sent once as startup
+    options. PgBouncer rejects unknown startup parameters and would leak SET
+    across clients, so in that mode they are applied with SET LOCAL at the
+    start of every transaction instead (see apply_transaction_settings).
+    psycopg2 never uses server-side prepared statements, so nothing else
+    needs switching off.
+
+    Returns:
+        dict: Keyword arguments for create_engine.
+    """
+    connect_args = {"connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", 10))}
+    if not pgbouncer_mode():
+        options = [f"-c {name}={ms}" for name, ms in _server_timeouts().items() if ms]
+        if options:
+            connect_args["options"] = " ".join(options)
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_flag("DB_POOL_PRE_PING", True),
+        "connect_args": connect_args,
+    }
+
+
+def _server_timeouts():
+    return {
+        "statement_timeout": default_statement_timeout_ms(),
+        "idle_in_transaction_session_timeout": int(
+            os.getenv("DB_IDLE_IN_TRANSACTION_TIMEOUT_MS", 0)
+        ),
+    }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool that records how often connections are checked out, how long
+    callers wait for one and how often they give up, for the pool stats
+    endpoint. The counters are per pool, so each bind reports its own.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._max_overflow_seen = 0
+
+    def recreate(self):
+        # dispose() and fork handling build a fresh pool; keep the counters
+        pool = super().recreate()
+        pool._checkouts = self._checkouts
+        pool._timeouts = self._timeouts
+        pool._wait_seconds = self._wait_seconds
+        pool._max_wait_seconds = self._max_wait_seconds
+        pool._max_overflow_seen = self._max_overflow_seen
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+        waited = time.perf_counter() - started
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_seconds += waited
+            self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            self._max_overflow_seen = max(self._max_overflow_seen, self.overflow())
+        return connection
+
+    def stats(self):
+        """
+        Returns:
+            dict: Current occupancy and cumulative checkout counters.
+        """
+        with self._stats_lock:
+            checkouts = self._checkouts
+            return {
+                "size": self.size(),
+                "checked_in": self.checkedin(),
+                "checked_out": self.checkedout(),
+                "overflow": max(self.overflow(), 0),
+                "max_overflow": self._max_overflow,
+                "max_overflow_seen": max(self._max_overflow_seen, 0),
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "wait_ms_total": round(self._wait_seconds * 1000, 3),
+                "wait_ms_mean": round(self._wait_seconds * 1000 / checkouts, 3)
+                if checkouts
+                else 0.0,
+                "wait_ms_max": round(self._max_wait_seconds * 1000, 3),
+            }
+
+
+def pool_stats(engines):
+    """
+    Collects InstrumentedQueuePool stats for a mapping of engines.
+
+    Args:
+        engines (dict): Bind key to engine, as in db.engines.
+
+    Returns:
+        dict: Bind name ("primary" for the default bind) to pool stats.
+    """
+    return {
+        key or "primary": engine.pool.stats()
+        for key, engine in engines.items()
+        if isinstance(engine.pool, InstrumentedQueuePool)
+    }
+
+
+def statement_timeout(env_var, default_ms):
+    """
+    Decorator giving a route its own statement_timeout, read from env_var.
+    It is applied with SET LOCAL to every transaction the request begins,
+    so it is safe behind PgBouncer and never outlives the request.
+
+    Args:
+        env_var (str): Environment variable holding the timeout in ms.
+        default_ms (int): Timeout used when env_var is unset; 0 disables it.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            g.statement_timeout_ms = int(os.getenv(env_var, default_ms))
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def apply_transaction_settings(session, transaction, connection):
+    """
+    after_begin listener: issues SET LOCAL for the route's statement_timeout
+    and, in PgBouncer mode, for the server-wide defaults that could not be
+    sent as startup options.
+    """
+    settings = {}
+    if pgbouncer_mode():
+        settings = {name: ms for name, ms in _server_timeouts().items() if ms}
+    if has_request_context() and g.get("statement_timeout_ms") is not None:
+        # Set even when 0, which lifts a connection-wide default
+        settings["statement_timeout"] = g.statement_timeout_ms
+    for name, ms in settings.items():
+        connection.exec_driver_sql(f"SET LOCAL {name} = {int(ms)}")
@@ -0,0 +1,78 @@
+import os
+import zlib
+from flask import current_app
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook
+from flask_app.modules.serialize import audiobook_rows_select, audiobook_row_to_dict
+
+
+def export_batch_size():
+    """Rows fetched per keyset batch, from EXPORT_BATCH_SIZE (default 1000)."""
+    return max(int(os.getenv("EXPORT_BATCH_SIZE", 1000)), 1)
+
+
+def audiobook_export_lines(fields, after_id=0, batch_size=None):
+    """
+    Yields the catalog as NDJSON lines (one encoded audiobook per line),
+    ordered by id and starting after `after_id`.
+
+    The table is walked in keyset batches (WHERE id > :last ORDER BY id
+    LIMIT :batch), each read with yield_per, and the transaction is closed
+    between batches. Memory use and snapshot age stay bounded whatever the
+    catalog size, and an interrupted export resumes from the last id seen.
+
+    Args:
+        fields (tuple): Field names to export; must include id.
+        after_id (int): Only audiobooks with a greater id are exported.
+        batch_size (int): Rows per batch; defaults to export_batch_size().
+
+    Yields:
+        bytes: One newline-terminated JSON document per audiobook.
+    """
+    batch_size = batch_size or export_batch_size()
+    base = audiobook_rows_select(fields).order_by(Audiobook.id)
+    last_id = after_id
+
+    while True:
+        stmt = (
+            base.where(Audiobook.id > last_id)
+            .limit(batch_size)
+            .execution_options(yield_per=min(batch_size, 500))
+        )
+        count = 0
+        for row in db.session.execute(stmt):
+            count += 1
+            last_id = row.id
+            line = current_app.json.dumps(
+                audiobook_row_to_dict(row), separators=(",", ":")
+            )
+            yield (line + "\n").encode("utf-8")
+        db.session.close()
+        if count < batch_size:
+            return
+
+
+def gzip_stream(chunks, level=6):
+    """
+    Gzips a stream of byte chunks incrementally. Output is sync-flushed
+    after every 64 KiB of input, so the client keeps receiving data instead
+    of waiting for the whole export.
+
+    Args:
+        chunks (iterable): Byte strings to compress.
+        level (int): zlib compression level.
+
+    Yields:
+        bytes: Gzip-framed output.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    pending = 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if pending >= 64 * 1024:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if data:
+            yield data
+    yield compressor.flush()
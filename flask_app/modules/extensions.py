@@ -2,7 +2,11 @@ from flask_sqlalchemy import SQLAlchemy
 from flask import current_app
 from flask_login import LoginManager
 from flask_bcrypt import Bcrypt
+from sqlalchemy import event
+from flask_app.modules.routing import RoutingSession
+from flask_app.modules.database import apply_transaction_settings
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+event.listen(RoutingSession, "after_begin", apply_transaction_settings)
 login_manager = LoginManager()
 bcrypt = Bcrypt()
@@ -1,7 +1,9 @@
 import requests
 import os
+import time
 import click
 from rapidfuzz import fuzz, process as fuzz_process
+from flask_app.modules.metrics import GOOGLE_BOOKS_REQUESTS
 
 
 def get_book_info(book_title, author=None):
@@ -21,10 +23,12 @@ def get_book_info(book_title, author=None):
         "printType": "books",  # Search only for books
     }
 
+    started = time.perf_counter()
     try:
         response = requests.get(BOOKS_API_URL, params=params)
         response.raise_for_status()  # Check for HTTP errors
     except requests.exceptions.RequestException as e:
+        GOOGLE_BOOKS_REQUESTS.labels("error").observe(time.perf_counter() - started)
         print(f"\tError querying Google Books API for '{book_title}': {e}")
         exit(1)
     except requests.exceptions.HTTPError as e:
@@ -34,6 +38,8 @@ def get_book_info(book_title, author=None):
         print(f"\tTimeout error querying Google Books API for '{book_title}': {e}")
         exit(1)
 
+    GOOGLE_BOOKS_REQUESTS.labels("ok").observe(time.perf_counter() - started)
+
     data = response.json()
     items = data.get("items")
 
@@ -0,0 +1,208 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook, Category, AUDIOBOOK_LIST_FIELDS
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.pagination import encode_cursor
+from flask_app.modules.serialize import audiobook_dicts_in_order
+from flask_app.modules.shuffle import (
+    scheduled_seed,
+    shuffled_page_ids,
+    sample_audiobook_ids,
+)
+
+# First books of every category in one statement: a LIMIT per category
+# through a lateral subquery, in the same order as the category page
+CATEGORY_HEADS_SQL = db.text("""
+    SELECT categories.id AS category_id, head.audiobook_id
+    FROM categories
+    CROSS JOIN LATERAL (
+        SELECT audiobook_id
+        FROM audiobook_categories
+        WHERE audiobook_categories.category_id = categories.id
+        ORDER BY audiobook_id
+        LIMIT :per_category
+    ) AS head
+""")
+
+
+def snapshot_path():
+    """Where the bundle is written, from HOMEPAGE_SNAPSHOT_PATH."""
+    return os.getenv(
+        "HOMEPAGE_SNAPSHOT_PATH",
+        os.path.join(current_app.instance_path, "homepage_snapshot.json"),
+    )
+
+
+def build_homepage_bundle():
+    """
+    Materializes everything the homepage shows: categories in sort_order
+    with their first books, the first page of the scheduled shuffle, a pool
+    of pre-sampled random audiobooks and the catalog size.
+
+    Returns:
+        dict: The bundle, including the generation and seed it was built
+              for.
+    """
+    per_category = int(os.getenv("HOMEPAGE_BOOKS_PER_CATEGORY", 12))
+    feed_size = int(os.getenv("HOMEPAGE_FEED_SIZE", 12))
+    random_pool = int(os.getenv("HOMEPAGE_RANDOM_POOL", 40))
+    generation = catalog_cache.generation()
+    seed = scheduled_seed()
+
+    categories = Category.query.order_by(Category.sort_order).all()
+    heads = {}
+    for row in db.session.execute(CATEGORY_HEADS_SQL, {"per_category": per_category}):
+        heads.setdefault(row.category_id, []).append(row.audiobook_id)
+
+    feed_ids, next_position = shuffled_page_ids(seed, feed_size)
+    random_ids = sample_audiobook_ids(random_pool)
+
+    # Serialize every audiobook the bundle mentions in one query
+    all_ids = list(dict.fromkeys(
+        [i for ids in heads.values() for i in ids] + feed_ids + random_ids
+    ))
+    by_id = {
+        book["id"]: book
+        for book in audiobook_dicts_in_order(all_ids, AUDIOBOOK_LIST_FIELDS)
+    }
+
+    def books(ids):
+        return [by_id[i] for i in ids if i in by_id]
+
+    next_cursor = None
+    if next_position:
+        next_position["s"] = seed
+        next_cursor = encode_cursor(next_position)
+
+    return {
+        "categories": [
+            dict(category.to_dict(), audiobooks=books(heads.get(category.id, [])))
+            for category in categories
+        ],
+        "feed": {"audiobooks": books(feed_ids), "next_cursor": next_cursor, "seed": seed},
+        "random": books(random_ids),
+        "count": db.session.execute(db.select(db.func.count(Audiobook.id))).scalar(),
+        "generation": generation,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class HomepageSnapshot:
+    """A serialized bundle, in plain and gzipped form, with its ETag."""
+
+    def __init__(self, body):
+        bundle = json.loads(body)
+        self.body = body
+        self.gzip_body = gzip.compress(body, 9)
+        self.generation = bundle["generation"]
+        self.seed = bundle["feed"]["seed"]
+        self.etag = "homepage-" + hashlib.sha1(body).hexdigest()[:16]
+
+    @classmethod
+    def build(cls):
+        return cls(current_app.json.dumps(build_homepage_bundle()).encode("utf-8"))
+
+    def save(self, path):
+        """Writes the bundle atomically, so readers never see a partial file."""
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # A temporary file of its own, so concurrent writers never share one
+        with tempfile.NamedTemporaryFile(
+            dir=directory, prefix=os.path.basename(path) + ".", suffix=".tmp", delete=False
+        ) as f:
+            f.write(self.body)
+        try:
+            os.replace(f.name, path)
+        except OSError:
+            os.unlink(f.name)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "rb") as f:
+                return cls(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+class HomepageSnapshots:
+    """
+    Holds the current homepage snapshot in memory, so serving it touches
+    neither the database nor the disk.
+
+    The first request loads the snapshot file written by `flask
+    build_homepage` (or builds one) and starts a background refresher.
+    Every HOMEPAGE_REFRESH_SECONDS the refresher checks whether the catalog
+    generation or the scheduled shuffle seed has moved on. If so it picks
+    up a newer file from another process, or rebuilds and saves the bundle
+    itself, then swaps it in.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def current(self):
+        """Returns the in-memory snapshot, loading or building the first one."""
+        if self.snapshot is None:
+            with self._lock:
+                if self.snapshot is None:
+                    self.snapshot = self._fresh(HomepageSnapshot.load(snapshot_path()))
+                    self._start_refresher(current_app._get_current_object())
+        return self.snapshot
+
+    def _fresh(self, candidate):
+        # Keep a loaded file only if it matches the current catalog and seed
+        if (
+            candidate is not None
+            and candidate.generation == catalog_cache.generation()
+            and candidate.seed == scheduled_seed()
+        ):
+            return candidate
+        snapshot = HomepageSnapshot.build()
+        try:
+            snapshot.save(snapshot_path())
+        except OSError as e:
+            current_app.logger.warning(f"Could not save homepage snapshot: {e}")
+        return snapshot
+
+    def _start_refresher(self, app):
+        interval = float(os.getenv("HOMEPAGE_REFRESH_SECONDS", 60))
+        if interval <= 0 or self._thread is not None:
+            return
+
+        def refresh_forever():
+            while True:
+                time.sleep(interval)
+                with app.app_context():
+                    try:
+                        snapshot = self.snapshot
+                        if (
+                            snapshot.generation != catalog_cache.generation()
+                            or snapshot.seed != scheduled_seed()
+                        ):
+                            self.snapshot = self._fresh(
+                                HomepageSnapshot.load(snapshot_path())
+                            )
+                    except Exception as e:
+                        app.logger.warning(f"Homepage snapshot refresh failed: {e}")
+                    finally:
+                        db.session.remove()
+
+        self._thread = threading.Thread(
+            target=refresh_forever, name="homepage-refresher", daemon=True
+        )
+        self._thread.start()
+
+
+homepage_snapshots = HomepageSnapshots()
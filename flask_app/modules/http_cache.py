@@ -0,0 +1,60 @@
+import os
+from functools import wraps
+from flask import current_app, request
+
+
+def public_cache_control():
+    """
+    Cache-Control for catalog responses that browsers and CDNs may share.
+    Shared caches hold them for HTTP_CACHE_S_MAXAGE seconds and browsers for
+    HTTP_CACHE_MAX_AGE, after which both revalidate with the ETag.
+    """
+    max_age = int(os.getenv("HTTP_CACHE_MAX_AGE", 60))
+    s_maxage = int(os.getenv("HTTP_CACHE_S_MAXAGE", 300))
+    stale = int(os.getenv("HTTP_CACHE_STALE_WHILE_REVALIDATE", 60))
+    return (
+        f"public, max-age={max_age}, s-maxage={s_maxage}, "
+        f"stale-while-revalidate={stale}"
+    )
+
+
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def conditional(etag_func, cache_control=public_cache_control, vary=None):
+    """
+    Decorator adding strong ETag validation to a view.
+
+    etag_func receives the view arguments and returns a validator built from
+    cheap inputs (row timestamps, the catalog generation) or None when no
+    validator applies. A matching If-None-Match is answered with a 304
+    before the view runs, so it never loads or serializes any rows.
+
+    Args:
+        etag_func (callable): Builds the validator from the view kwargs.
+        cache_control (callable): Returns the Cache-Control header value.
+        vary (str): Optional Vary header value.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag = etag_func(**kwargs)
+
+            if etag and request.if_none_match.contains(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            if etag:
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = cache_control()
+                if vary:
+                    response.vary.add(vary)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -1,6 +1,8 @@
 import os
 import json
+import time
 from ollama import Client
+from flask_app.modules.metrics import LLM_REQUESTS
 
 
 def ollama_request(prompt, model, model_class=None):
@@ -12,20 +14,29 @@ def ollama_request(prompt, model, model_class=None):
         model = "qwen2.5:latest"  # good and fast
     format_schema = model_class.model_json_schema()
     client = Client(host=host)
-    response = client.chat(
-        model=model,
-        format=format_schema,
-        messages=[
-            {
-                "role": "user",
-                "content": prompt,
-            },
-        ],
-    )
+    started = time.perf_counter()
+    try:
+        response = client.chat(
+            model=model,
+            format=format_schema,
+            messages=[
+                {
+                    "role": "user",
+                    "content": prompt,
+                },
+            ],
+        )
+    except Exception:
+        LLM_REQUESTS.labels("error").observe(time.perf_counter() - started)
+        raise
+    elapsed = time.perf_counter() - started
     # print(f"\tOllama response: {response.message.content}")
     # myjson = format_schema.model_validate_json(response.message.content)
     try:
-        return json.loads(response.message.content)
+        parsed = json.loads(response.message.content)
     except json.JSONDecodeError:
+        LLM_REQUESTS.labels("invalid_json").observe(elapsed)
         print("\tWarning: Failed to parse Ollama response as JSON.")
         return None
+    LLM_REQUESTS.labels("ok").observe(elapsed)
+    return parsed
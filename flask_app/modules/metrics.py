@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from flask import g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+)
+
+# Request metrics. Routes are labelled by their URL rule, not the raw path,
+# so ids in the path do not multiply the series
+REQUEST_LATENCY = Histogram(
+    "ytbooks_http_request_duration_seconds",
+    "Time spent serving HTTP requests.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+# Pool and cache state. Each process reports its own; gauges are summed
+# over live processes in multi-process mode
+POOL_CONNECTIONS = Gauge(
+    "ytbooks_db_pool_connections",
+    "Connections per pool by state (checked_out, checked_in, overflow, size).",
+    ["bind", "state"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUTS = Counter(
+    "ytbooks_db_pool_checkouts", "Connections checked out of the pool.", ["bind"]
+)
+POOL_CHECKOUT_WAIT = Counter(
+    "ytbooks_db_pool_checkout_wait_seconds",
+    "Time spent waiting to check a connection out.",
+    ["bind"],
+)
+POOL_TIMEOUTS = Counter(
+    "ytbooks_db_pool_timeouts", "Checkouts that gave up after DB_POOL_TIMEOUT.", ["bind"]
+)
+CACHE_LOOKUPS = Counter(
+    "ytbooks_catalog_cache_lookups",
+    "Catalog cache lookups by result (hits, misses, errors).",
+    ["result"],
+)
+
+# Ingestion metrics, recorded by the crawl commands
+VIDEOS_SEEN = Counter(
+    "ytbooks_ingest_videos_seen", "Videos considered by the crawler."
+)
+VIDEOS_SKIPPED = Counter(
+    "ytbooks_ingest_videos_skipped",
+    "Videos stored as skipped, by SkippedVideo.reason.",
+    ["reason"],
+)
+BOOKS_STORED = Counter("ytbooks_ingest_books_stored", "Audiobooks stored.")
+WRITES_FAILED = Counter(
+    "ytbooks_ingest_writes_failed",
+    "Buffered books and skipped videos the bulk writer gave up on, by kind.",
+    ["kind"],
+)
+LLM_REQUESTS = Histogram(
+    "ytbooks_llm_request_duration_seconds",
+    "LLM calls and their latency, by outcome.",
+    ["outcome"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 40, 80),
+)
+GOOGLE_BOOKS_REQUESTS = Histogram(
+    "ytbooks_google_books_request_duration_seconds",
+    "Google Books API calls and their latency, by outcome.",
+    ["outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+
+
+def multiprocess_dir():
+    """
+    The directory shared by all processes' metric files, from
+    PROMETHEUS_MULTIPROC_DIR, or None in single-process mode.
+    """
+    return os.getenv("PROMETHEUS_MULTIPROC_DIR") or None
+
+
+def render_latest():
+    """
+    Renders every metric in the Prometheus text format. In multi-process
+    mode the values are read from the files of all gunicorn workers and CLI
+    processes sharing PROMETHEUS_MULTIPROC_DIR.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    if multiprocess_dir():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid):
+    """Drops a dead worker's live gauges; call from gunicorn's child_exit hook."""
+    if multiprocess_dir():
+        multiprocess.mark_process_dead(pid)
+
+
+class RequestMetrics:
+    """
+    Records request latency per route and, after each request, brings the
+    pool and cache series up to date with the process's own counters.
+
+    Pool and cache counters live in InstrumentedQueuePool.stats() and
+    CatalogCache.stats; only the growth since the last request is added
+    to the Prometheus counters, so those modules stay unaware of metrics.
+    """
+
+    def __init__(self, app=None):
+        self._last = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions["request_metrics"] = self
+
+    def _start(self):
+        g.metrics_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.get("metrics_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            REQUEST_LATENCY.labels(
+                request.method, route, str(response.status_code)
+            ).observe(time.perf_counter() - started)
+        self.sync()
+        return response
+
+    def _add_growth(self, counter, key, value):
+        growth = value - self._last.get(key, 0)
+        if growth > 0:
+            counter.inc(growth)
+        self._last[key] = value
+
+    def sync(self):
+        """Copies the current pool and cache counters into the metrics."""
+        from flask_app.modules.extensions import db
+        from flask_app.modules.database import pool_stats
+        from flask_app.modules.cache import catalog_cache
+
+        with self._lock:
+            self._sync(pool_stats(db.engines), dict(catalog_cache.stats))
+
+    def _sync(self, pools, cache_stats):
+        for bind, stats in pools.items():
+            for state in ("checked_out", "checked_in", "overflow", "size"):
+                POOL_CONNECTIONS.labels(bind, state).set(stats[state])
+            self._add_growth(
+                POOL_CHECKOUTS.labels(bind), ("checkouts", bind), stats["checkouts"]
+            )
+            self._add_growth(
+                POOL_CHECKOUT_WAIT.labels(bind),
+                ("wait", bind),
+                stats["wait_ms_total"] / 1000,
+            )
+            self._add_growth(
+                POOL_TIMEOUTS.labels(bind), ("timeouts", bind), stats["timeouts"]
+            )
+
+        for result in ("hits", "misses", "errors"):
+            self._add_growth(
+                CACHE_LOOKUPS.labels(result),
+                ("cache", result),
+                cache_stats.get(result, 0),
+            )
+
+
+request_metrics = RequestMetrics()
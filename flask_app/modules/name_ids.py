@@ -0,0 +1,112 @@
+import threading
+from sqlalchemy.dialects.postgresql import insert
+from flask_app.modules.extensions import db
+from flask_app.models import Author, Category
+
+
+class NameIdCache:
+    """
+    name -> id cache for a table with a unique ``name`` column, so storing
+    a book does not look its author and categories up one by one.
+
+    The whole table is loaded by warm() when a crawl starts, or else on
+    first use. Unknown names are created with one INSERT ... ON CONFLICT
+    (name) DO NOTHING RETURNING for the batch; names another worker
+    created first are then read back with one SELECT.
+
+    Rows created in a transaction stay private to the calling thread until
+    publish() is called after the commit, so no other worker ever uses an
+    id whose row might still be rolled back; discard() forgets them after a
+    rollback.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _pending(self):
+        if not hasattr(self._local, "pending"):
+            self._local.pending = {}
+        return self._local.pending
+
+    def warm(self):
+        """Loads every name and id, replacing what is cached."""
+        table = self.model.__table__
+        rows = db.session.execute(db.select(table.c.name, table.c.id)).all()
+        with self._lock:
+            self.ids = dict(rows)
+
+    def clear(self):
+        """Drops the cache; the next lookup reloads it."""
+        with self._lock:
+            self.ids = None
+        self._pending().clear()
+
+    def ids_for(self, names):
+        """
+        Resolves names to ids, creating rows for the ones that do not exist
+        yet in the current transaction.
+
+        Args:
+            names (iterable): Names; duplicates and empty names are ignored.
+
+        Returns:
+            dict: name -> id for every given name.
+        """
+        names = [name for name in dict.fromkeys(names) if name]
+        ids = self.ids
+        if ids is None:
+            self.warm()
+            ids = self.ids
+        pending = self._pending()
+        found = {}
+        missing = []
+        for name in names:
+            known = ids.get(name) or pending.get(name)
+            if known is None:
+                missing.append(name)
+            else:
+                found[name] = known
+        if missing:
+            created = self._create(missing)
+            pending.update(created)
+            found.update(created)
+        return found
+
+    def _create(self, names):
+        table = self.model.__table__
+        rows = db.session.execute(
+            insert(table)
+            .values([{"name": name} for name in names])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(table.c.name, table.c.id)
+        ).all()
+        created = dict(rows)
+        # Names that conflicted were committed by someone else; a new
+        # statement sees them
+        others = [name for name in names if name not in created]
+        if others:
+            created.update(
+                db.session.execute(
+                    db.select(table.c.name, table.c.id).where(table.c.name.in_(others))
+                ).all()
+            )
+        return created
+
+    def publish(self):
+        """Shares this thread's new rows with other workers, after a commit."""
+        pending = self._pending()
+        if pending and self.ids is not None:
+            with self._lock:
+                self.ids.update(pending)
+        pending.clear()
+
+    def discard(self):
+        """Forgets this thread's new rows, after a rollback."""
+        self._pending().clear()
+
+
+author_ids = NameIdCache(Author)
+category_ids = NameIdCache(Category)
@@ -0,0 +1,80 @@
+import base64
+import json
+import math
+
+
+def encode_cursor(data):
+    """
+    Encodes a keyset position as an opaque, URL-safe cursor string.
+
+    Args:
+        data (dict): JSON-serializable keyset position.
+
+    Returns:
+        str: The encoded cursor.
+    """
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor string from the request.
+
+    Returns:
+        dict: The keyset position, or None if the cursor is missing or malformed.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _int_id(value):
+    # Ids and id watermarks are Postgres integers
+    return type(value) is int and 0 <= value <= 2**31 - 1
+
+
+# Shapes of the keyset positions each listing issues, as key -> check
+SHUFFLE_CURSOR = {
+    "p": lambda value: type(value) is int and value in (0, 1),
+    "k": lambda value: type(value) in (int, float) and math.isfinite(value),
+    "i": _int_id,
+    "s": lambda value: isinstance(value, str),
+}
+AUTHOR_NAME_CURSOR = {"n": lambda value: isinstance(value, str)}
+AUTHOR_BOOKS_CURSOR = {"i": _int_id}
+
+
+def parse_cursor(cursor, shape):
+    """
+    Decodes a cursor and checks it has the shape its listing issues, so a
+    crafted cursor is rejected instead of reaching the query.
+
+    Args:
+        cursor (str): The cursor string from the request, or None.
+        shape (dict): Key -> check, e.g. SHUFFLE_CURSOR.
+
+    Returns:
+        dict: The keyset position, or None if no cursor was given.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the shape.
+    """
+    if not cursor:
+        return None
+    data = decode_cursor(cursor)
+    if (
+        data is None
+        or data.keys() != shape.keys()
+        or not all(check(data[key]) for key, check in shape.items())
+    ):
+        raise ValueError("Invalid cursor")
+    return data
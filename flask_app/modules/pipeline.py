@@ -0,0 +1,155 @@
+import queue
+import threading
+import time
+from collections import Counter
+from flask_app.modules.extensions import db
+
+# Tells a stage worker to finish
+_STOP = object()
+
+
+class Stage:
+    """
+    One step of a StagedPipeline.
+
+    Args:
+        name (str): Stage name, used in logs and stats.
+        func (callable): Takes an item and returns the item for the next
+                         stage, or None to drop it.
+        workers (int): Threads running this stage.
+        slots (threading.Semaphore): Optional semaphore shared with other
+                                     stages, held while func runs, to cap
+                                     calls to a shared backend.
+        idle (callable): Optional, called by each worker after a second
+                         without items, e.g. to flush time-based buffers.
+    """
+
+    def __init__(self, name, func, workers=1, slots=None, idle=None):
+        self.name = name
+        self.func = func
+        self.workers = max(int(workers), 1)
+        self.slots = slots
+        self.idle = idle
+
+
+class StagedPipeline:
+    """
+    Runs items through a chain of stages, each with its own worker threads,
+    connected by bounded queues. submit() blocks when the first queue is
+    full, so a fast producer is slowed to the pace of the slowest stage
+    instead of piling up work in memory.
+
+    Workers run inside their own app context and remove their session
+    after each item, so no connection is held between items. An exception
+    in a stage drops that item and is logged; a SystemExit (which the
+    Google Books client raises on API errors) stops the pipeline and is
+    re-raised in the submitting thread.
+    """
+
+    def __init__(self, app, stages, queue_size=8):
+        self.app = app
+        self.stages = stages
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._threads = []
+        self._fatal = None
+        self._started = time.perf_counter()
+
+        for index, stage in enumerate(stages):
+            threads = [
+                threading.Thread(
+                    target=self._work,
+                    args=(index,),
+                    name=f"ingest-{stage.name}-{n}",
+                    daemon=True,
+                )
+                for n in range(stage.workers)
+            ]
+            for thread in threads:
+                thread.start()
+            self._threads.append(threads)
+
+    def submit(self, item):
+        """Queues an item for the first stage, waiting while the queue is full."""
+        self._raise_if_failed()
+        while True:
+            try:
+                self._queues[0].put(item, timeout=0.5)
+                return
+            except queue.Full:
+                self._raise_if_failed()
+
+    def close(self):
+        """Lets every queued item finish, stops the workers and prints a summary."""
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._queues[index].put(_STOP)
+            for thread in self._threads[index]:
+                thread.join()
+        elapsed = time.perf_counter() - self._started
+        summary = ", ".join(
+            f"{stage.name} {self.stats[(stage.name, 'in')]} in/"
+            f"{self.stats[(stage.name, 'out')]} out"
+            for stage in self.stages
+        )
+        print(f"Ingest pipeline finished in {elapsed:.1f} s: {summary}")
+        self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self._fatal is not None:
+            raise self._fatal
+
+    def _count(self, stage, outcome):
+        with self._stats_lock:
+            self.stats[(stage.name, outcome)] += 1
+
+    def _idle(self, stage):
+        try:
+            stage.idle()
+        except Exception as e:
+            print(f"\tWarning: Ingest stage '{stage.name}' idle task failed: {e}")
+        finally:
+            db.session.remove()
+
+    def _work(self, index):
+        stage = self.stages[index]
+        inbox = self._queues[index]
+        last = index == len(self.stages) - 1
+        with self.app.app_context():
+            while True:
+                if stage.idle is None:
+                    item = inbox.get()
+                else:
+                    try:
+                        item = inbox.get(timeout=1)
+                    except queue.Empty:
+                        self._idle(stage)
+                        continue
+                if item is _STOP:
+                    return
+                if self._fatal is not None:
+                    continue
+                self._count(stage, "in")
+                try:
+                    if stage.slots is not None:
+                        with stage.slots:
+                            result = stage.func(item)
+                    else:
+                        result = stage.func(item)
+                except SystemExit as e:
+                    self._fatal = e
+                    continue
+                except Exception as e:
+                    print(f"\tWarning: Ingest stage '{stage.name}' failed: {e}")
+                    continue
+                finally:
+                    db.session.remove()
+
+                if result is None:
+                    continue
+                self._count(stage, "out")
+                if not last:
+                    # Workers keep draining their queue even after a
+                    # failure, so this never blocks for good
+                    self._queues[index + 1].put(result)
@@ -0,0 +1,66 @@
+from flask import abort, request
+from sqlalchemy.orm import load_only, noload
+from flask_app.models import Audiobook, AUDIOBOOK_FIELDS, AUDIOBOOK_LIST_FIELDS
+
+# Plain columns backing each serialized field
+FIELD_COLUMNS = {
+    "id": Audiobook.id,
+    "video_id": Audiobook.video_id,
+    "title": Audiobook.title,
+    "description": Audiobook.description,
+    "thumbnail": Audiobook.thumbnail,
+    "author": Audiobook.author_id,
+    "duration": Audiobook.duration,
+    "timestamp": Audiobook.timestamp,
+}
+
+
+def requested_fields(default=AUDIOBOOK_LIST_FIELDS):
+    """
+    Reads the sparse fieldset from the ``fields`` query parameter.
+
+    ``fields=id,title`` selects those fields, ``fields=all`` selects every
+    field, and no parameter gives the endpoint's default. Unknown field names
+    abort with a 400.
+
+    Args:
+        default (tuple): Fields returned when the parameter is absent.
+
+    Returns:
+        tuple: The selected field names, in AUDIOBOOK_FIELDS order.
+    """
+    raw = request.args.get("fields")
+    if not raw:
+        return tuple(default)
+    if raw == "all":
+        return AUDIOBOOK_FIELDS
+
+    names = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = names - set(AUDIOBOOK_FIELDS)
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(sorted(unknown))}")
+    # id is always returned so clients can key the results
+    names.add("id")
+    return tuple(name for name in AUDIOBOOK_FIELDS if name in names)
+
+
+def projection_options(fields):
+    """
+    Loader options that make an Audiobook query fetch only what `fields`
+    needs. Unselected columns (notably the long description) are left out of
+    the SELECT, and the author/categories joins are skipped when unused.
+
+    Args:
+        fields (iterable): Field names as returned by requested_fields.
+
+    Returns:
+        list: Options for Select.options() / Query.options().
+    """
+    fields = set(fields)
+    columns = [column for name, column in FIELD_COLUMNS.items() if name in fields]
+    options = [load_only(*columns)]
+    if "author" not in fields:
+        options.append(noload(Audiobook.author))
+    if "categories" not in fields:
+        options.append(noload(Audiobook.categories))
+    return options
@@ -0,0 +1,141 @@
+import json
+import os
+import re
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Literals and bind placeholders are replaced so that the same statement
+# with different values shares one fingerprint
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_REPEATED_PLACEHOLDERS = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    """
+    Normalizes a SQL statement for grouping: literals and placeholders
+    become ``?``, IN lists collapse to ``?, ...`` and whitespace is squeezed.
+
+    Args:
+        statement (str): The SQL as sent to the driver.
+
+    Returns:
+        str: The fingerprint.
+    """
+    statement = _PLACEHOLDER.sub("?", statement)
+    statement = _REPEATED_PLACEHOLDERS.sub("?, ...", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds the time spent in dumps() to the request's serialization time."""
+
+    def dumps(self, obj, **kwargs):
+        if not has_request_context():
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            g.timing_serialize = g.get("timing_serialize", 0.0) + (
+                time.perf_counter() - started
+            )
+
+
+class RequestTiming:
+    """
+    Per-request accounting of SQL statements, database time, JSON
+    serialization and total handler time.
+
+    Statements are counted through engine events on every engine (primary
+    and replicas). Each response carries a Server-Timing header; every
+    request is logged as one JSON line at debug level, and at warning level,
+    with its most repeated statement fingerprints, when it goes over
+    REQUEST_QUERY_BUDGET statements or REQUEST_LATENCY_BUDGET_MS.
+    Set SERVER_TIMING=0 to leave the header off.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.header_enabled = os.getenv("SERVER_TIMING", "1") != "0"
+        self.query_budget = int(os.getenv("REQUEST_QUERY_BUDGET", 20))
+        self.latency_budget_ms = float(os.getenv("REQUEST_LATENCY_BUDGET_MS", 500))
+
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        app.extensions["request_timing"] = self
+
+    def _start(self):
+        g.timing_started = time.perf_counter()
+        g.timing_serialize = 0.0
+        g.timing_sql_count = 0
+        g.timing_sql_seconds = 0.0
+        g.timing_statements = Counter()
+
+    def _finish(self, response):
+        if "timing_started" not in g:
+            return response
+        total_ms = (time.perf_counter() - g.timing_started) * 1000
+        db_ms = g.timing_sql_seconds * 1000
+        serialize_ms = g.timing_serialize * 1000
+
+        if self.header_enabled:
+            response.headers["Server-Timing"] = ", ".join([
+                f'db;dur={db_ms:.1f};desc="{g.timing_sql_count} queries"',
+                f"serialize;dur={serialize_ms:.1f}",
+                f"app;dur={total_ms:.1f}",
+            ])
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "endpoint": request.endpoint,
+            "status": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_ms": round(db_ms, 1),
+            "serialize_ms": round(serialize_ms, 1),
+            "queries": g.timing_sql_count,
+        }
+        over_budget = (
+            g.timing_sql_count > self.query_budget
+            or total_ms > self.latency_budget_ms
+        )
+        if over_budget:
+            record["statements"] = [
+                {"count": count, "sql": sql}
+                for sql, count in g.timing_statements.most_common(5)
+            ]
+            current_app.logger.warning(json.dumps({"request_over_budget": record}))
+        else:
+            current_app.logger.debug(json.dumps({"request": record}))
+        return response
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements on one connection run one at a time, so a single start
+    # time per connection is enough
+    if has_request_context() and "timing_started" in g:
+        conn.info["timing_query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop("timing_query_started", None)
+    if started is None or not has_request_context() or "timing_started" not in g:
+        return
+    g.timing_sql_seconds += time.perf_counter() - started
+    g.timing_sql_count += 1
+    g.timing_statements[fingerprint(statement)] += 1
+
+
+request_timing = RequestTiming()
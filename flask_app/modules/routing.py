@@ -0,0 +1,160 @@
+import os
+import random
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND_PREFIX = "replica_"
+
+# Cookie holding the time until which this client reads from the primary,
+# so it sees its own writes despite replication lag. It is kept out of the
+# Flask session: reading the session adds "Vary: Cookie" to the response,
+# which would stop shared caches from storing catalog responses
+PRIMARY_UNTIL_COOKIE = "primary_reads_until"
+
+# Each replica's WAL replay position in bytes, with when it was read
+REPLICA_LSN_SQL = (
+    "SELECT COALESCE(pg_last_wal_replay_lsn(), pg_current_wal_lsn()) - '0/0'::pg_lsn"
+)
+_replay_positions = {}
+_replay_lock = threading.Lock()
+
+
+def replica_binds(user, password, port, name):
+    """
+    Builds SQLALCHEMY_BINDS entries for the hosts in DB_READ_HOST, a comma
+    separated list of ``host`` or ``host:port`` replicas.
+
+    Returns:
+        dict: Bind key to database URI; empty when no replicas are set.
+    """
+    binds = {}
+    hosts = [h.strip() for h in os.getenv("DB_READ_HOST", "").split(",") if h.strip()]
+    for i, host in enumerate(hosts):
+        host, _, host_port = host.partition(":")
+        binds[f"{REPLICA_BIND_PREFIX}{i}"] = (
+            f"postgresql+psycopg2://{user}:{password}@{host}:{host_port or port}/{name}"
+        )
+    return binds
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to a replica when the current request chose
+    one (see use_replica_for_reads). Flushes and Core INSERT/UPDATE/DELETE
+    statements always go to the primary, as does everything outside a
+    request, such as CLI commands and background threads.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and not isinstance(clause, UpdateBase)
+            and has_request_context()
+        ):
+            replica = g.get("db_replica")
+            if replica is not None:
+                return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_caught_up(key, lsn):
+    """
+    Whether a replica has replayed the primary's WAL up to lsn.
+
+    Replay positions only move forward, so a position read earlier that is
+    already far enough is trusted; otherwise the replica is asked again, at
+    most every DB_REPLICA_LSN_POLL_SECONDS.
+
+    Args:
+        key (str): The replica's bind key.
+        lsn (int): WAL position in bytes.
+
+    Returns:
+        bool: True if the replica can serve reads that must include lsn.
+    """
+    replayed, read_at = _replay_positions.get(key, (None, 0.0))
+    if replayed is not None and replayed >= lsn:
+        return True
+    now = time.monotonic()
+    if now - read_at < float(os.getenv("DB_REPLICA_LSN_POLL_SECONDS", 0.5)):
+        return False
+
+    from flask_app.modules.extensions import db
+
+    try:
+        with db.engines[key].connect() as connection:
+            replayed = int(connection.execute(db.text(REPLICA_LSN_SQL)).scalar())
+    except Exception as e:
+        current_app.logger.warning(f"Reading replay position of '{key}' failed: {e}")
+        replayed = None
+    with _replay_lock:
+        _replay_positions[key] = (replayed, now)
+    return replayed is not None and replayed >= lsn
+
+
+def _primary_reads_until():
+    try:
+        return float(request.cookies.get(PRIMARY_UNTIL_COOKIE, 0))
+    except ValueError:
+        return 0
+
+
+def use_replica_for_reads():
+    """
+    before_request hook: routes this request's reads to a replica if it is
+    a GET/HEAD, replicas are configured, the client is not inside its
+    read-your-writes window, and the replica has replayed every write the
+    current catalog generation covers. The generation is pinned for the
+    request, so cached entries and ETags are never built from older data
+    than their generation says.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return
+
+    from flask_app.modules.extensions import db
+    from flask_app.modules.cache import catalog_cache
+
+    replicas = [key for key in db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+    if not replicas:
+        return
+    if _primary_reads_until() > time.time():
+        return
+
+    _, lsn = catalog_cache.pin_generation()
+    for replica in random.sample(replicas, len(replicas)):
+        if replica_caught_up(replica, lsn):
+            g.db_replica = replica
+            return
+
+
+def mark_primary_reads():
+    """
+    Sends this client's reads to the primary for the next
+    DB_READ_YOUR_WRITES_SECONDS, so a user who just changed something sees
+    the change even if the replicas have not replayed it yet. The cookie is
+    set by add_route_header.
+    """
+    g.primary_reads_window = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5))
+
+
+def add_route_header(response):
+    """
+    after_request hook reporting which database served the reads, and
+    setting the read-your-writes cookie after mark_primary_reads.
+    """
+    response.headers["X-DB-Route"] = g.get("db_replica") or "primary"
+    window = g.get("primary_reads_window")
+    if window:
+        response.set_cookie(
+            PRIMARY_UNTIL_COOKIE,
+            str(time.time() + window),
+            max_age=int(window) + 1,
+            httponly=True,
+            samesite="Lax",
+            secure=current_app.config.get("SESSION_COOKIE_SECURE", False),
+        )
+    return response
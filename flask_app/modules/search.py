@@ -0,0 +1,351 @@
+import math
+import os
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook
+from flask_app.modules.counting import estimate_rows
+from flask_app.modules.cache import catalog_cache
+
+# Must match the configuration used by the audiobooks_search_vector_update trigger
+SEARCH_CONFIG = "english"
+
+# Queries shorter than this yield too few trigrams for the GIN index to
+# narrow anything down, so fuzzy mode refuses them rather than scanning
+FUZZY_MIN_QUERY_LENGTH = 3
+
+FUZZY_MATCHES_SQL = """
+    WITH author_hits AS (
+        SELECT id, word_similarity(:q, name) AS score
+        FROM authors
+        WHERE :q <% name
+    ),
+    candidates AS (
+        SELECT id, word_similarity(:q, title) AS score
+        FROM audiobooks
+        WHERE :q <% title
+        UNION ALL
+        SELECT audiobooks.id, author_hits.score
+        FROM author_hits
+        JOIN audiobooks ON audiobooks.author_id = author_hits.id
+    )
+    SELECT id, max(score) AS score
+    FROM candidates
+    GROUP BY id
+"""
+
+FUZZY_COUNT_SQL = db.text(f"""
+    SELECT count(*) FROM ({FUZZY_MATCHES_SQL}) AS matches
+""")
+
+FUZZY_PAGE_SQL = db.text(f"""
+    SELECT id, score
+    FROM ({FUZZY_MATCHES_SQL}) AS matches
+    ORDER BY score DESC, id
+    LIMIT :limit OFFSET :offset
+""")
+
+# Same page, plus the total match count computed by a window over the
+# matches before LIMIT applies
+FUZZY_PAGE_WITH_TOTAL_SQL = db.text(f"""
+    SELECT id, score, count(*) OVER () AS total
+    FROM ({FUZZY_MATCHES_SQL}) AS matches
+    ORDER BY score DESC, id
+    LIMIT :limit OFFSET :offset
+""")
+
+
+FULL_TEXT_MATCHES_SQL = """
+    SELECT id FROM audiobooks
+    WHERE search_vector @@ websearch_to_tsquery(:config, :q)
+"""
+
+# Every facet is grouped over the same materialized match set in one
+# statement. The set is capped at :max_matches rows so a broad query costs
+# a bounded amount of work; the 'matched' row reports how many were used.
+FACETS_SQL = """
+    WITH matched AS MATERIALIZED (
+        SELECT id FROM ({matches}) AS hits
+        LIMIT :max_matches
+    )
+    SELECT 'matched' AS facet, NULL::integer AS id, NULL::text AS name,
+           count(*) AS count
+    FROM matched
+    UNION ALL
+    SELECT 'category', categories.id, categories.name, count(*)
+    FROM matched
+    JOIN audiobook_categories ON audiobook_categories.audiobook_id = matched.id
+    JOIN categories ON categories.id = audiobook_categories.category_id
+    GROUP BY categories.id, categories.name
+    UNION ALL
+    (
+        SELECT 'author', authors.id, authors.name, count(*)
+        FROM matched
+        JOIN audiobooks ON audiobooks.id = matched.id
+        JOIN authors ON authors.id = audiobooks.author_id
+        GROUP BY authors.id, authors.name
+        ORDER BY count(*) DESC, authors.name
+        LIMIT :top_authors
+    )
+    UNION ALL
+    SELECT 'duration', NULL, bucket, count(*)
+    FROM (
+        SELECT CASE
+            WHEN audiobooks.duration IS NULL THEN 'unknown'
+            WHEN audiobooks.duration < 3600 THEN '<1h'
+            WHEN audiobooks.duration < 18000 THEN '1-5h'
+            WHEN audiobooks.duration < 36000 THEN '5-10h'
+            WHEN audiobooks.duration < 72000 THEN '10-20h'
+            ELSE '20h+'
+        END AS bucket
+        FROM matched
+        JOIN audiobooks ON audiobooks.id = matched.id
+    ) AS durations
+    GROUP BY bucket
+"""
+
+DURATION_BUCKETS = ("<1h", "1-5h", "5-10h", "10-20h", "20h+", "unknown")
+
+# SQLSTATE for a statement cancelled by statement_timeout
+QUERY_CANCELED = "57014"
+
+
+def full_text_query(query):
+    """
+    Builds the tsquery for a user search string. websearch_to_tsquery accepts
+    free text (quoted phrases, "or", -exclusions) and never raises on bad syntax.
+    """
+    return func.websearch_to_tsquery(SEARCH_CONFIG, query)
+
+
+def full_text_page_ids(query, page, per_page, count="exact"):
+    """
+    Runs a ranked full-text search against the GIN-indexed search_vector.
+
+    One extra row is fetched to tell whether another page follows. With
+    count="exact" the total match count rides along on the same statement
+    as a window count; "estimate" asks the planner instead and "none" skips
+    the total entirely.
+
+    Args:
+        query (str): The user's search string.
+        page (int): 1-based page number.
+        per_page (int): Page size.
+        count (str): Count mode, see flask_app.modules.counting.
+
+    Returns:
+        tuple: (ids, total, has_next) with ids ordered by rank, best first.
+    """
+    tsquery = full_text_query(query)
+    rank = func.ts_rank(Audiobook.search_vector, tsquery)
+    matches = Audiobook.search_vector.bool_op("@@")(tsquery)
+
+    columns = [Audiobook.id]
+    if count == "exact":
+        columns.append(func.count().over().label("total"))
+    stmt = (
+        db.select(*columns)
+        .where(matches)
+        .order_by(rank.desc(), Audiobook.id)
+        .limit(per_page + 1)
+        .offset((page - 1) * per_page)
+    )
+    rows = db.session.execute(stmt).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if count == "none":
+        total = None
+    elif count == "estimate":
+        total = estimate_rows(db.select(Audiobook.id).where(matches))
+    elif rows:
+        total = rows[0].total
+    elif page > 1:
+        # Past the last page the window count has no rows to ride on
+        total = db.session.execute(
+            db.select(func.count()).select_from(Audiobook).where(matches)
+        ).scalar()
+    else:
+        total = 0
+
+    return [row.id for row in rows], total, has_next
+
+
+def fuzzy_threshold(requested=None):
+    """
+    Returns the word-similarity threshold for fuzzy search, taken from the
+    request when given, else SEARCH_FUZZY_THRESHOLD, clamped to [0.1, 1.0].
+    NaN and infinities would slip through the clamp, so a non-finite
+    request falls back to the configured threshold, and that to 0.5.
+    """
+    if requested is None or not math.isfinite(requested):
+        requested = float(os.getenv("SEARCH_FUZZY_THRESHOLD", 0.5))
+    if not math.isfinite(requested):
+        requested = 0.5
+    return min(max(requested, 0.1), 1.0)
+
+
+def fuzzy_page_ids(query, page, per_page, threshold=None, count="exact"):
+    """
+    Runs a typo-tolerant search over audiobook titles and author names.
+
+    Both lookups use the pg_trgm word-similarity operator (<%), which the
+    gin_trgm_ops indexes on audiobooks.title and authors.name can answer, so
+    matches are found by index even for misspellings like "Tolkein".
+    Results are ranked by the best similarity of title or author.
+
+    Args:
+        query (str): The user's search string.
+        page (int): 1-based page number.
+        per_page (int): Page size.
+        threshold (float): Minimum word similarity, see fuzzy_threshold.
+        count (str): Count mode, see flask_app.modules.counting.
+
+    Returns:
+        tuple: (ids, total, has_next) with ids ordered by similarity, best first.
+    """
+    if len(query.strip()) < FUZZY_MIN_QUERY_LENGTH:
+        return [], (None if count == "none" else 0), False
+
+    # set_config(..., true) scopes the threshold to the current transaction
+    db.session.execute(
+        db.text("SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"),
+        {"t": str(fuzzy_threshold(threshold))},
+    )
+    rows = db.session.execute(
+        FUZZY_PAGE_WITH_TOTAL_SQL if count == "exact" else FUZZY_PAGE_SQL,
+        {"q": query, "limit": per_page + 1, "offset": (page - 1) * per_page},
+    ).all()
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if count == "none":
+        total = None
+    elif count == "estimate":
+        total = estimate_rows(db.text(FUZZY_MATCHES_SQL), {"q": query})
+    elif rows:
+        total = rows[0].total
+    elif page > 1:
+        # Past the last page the window count has no rows to ride on
+        total = db.session.execute(FUZZY_COUNT_SQL, {"q": query}).scalar()
+    else:
+        total = 0
+    return [row.id for row in rows], total, has_next
+
+
+def _facet_rows(sql, params, timeout_ms):
+    """
+    Runs the facet query under a statement_timeout inside a savepoint, so a
+    query that blows its budget is cancelled without aborting the request's
+    transaction. Returns None when cancelled.
+    """
+    try:
+        with db.session.begin_nested():
+            previous = db.session.execute(
+                db.text("SELECT current_setting('statement_timeout')")
+            ).scalar()
+            db.session.execute(
+                db.text("SELECT set_config('statement_timeout', :ms, true)"),
+                {"ms": str(timeout_ms)},
+            )
+            rows = db.session.execute(db.text(sql), params).all()
+            db.session.execute(
+                db.text("SELECT set_config('statement_timeout', :ms, true)"),
+                {"ms": previous},
+            )
+            return rows
+    except OperationalError as e:
+        if getattr(e.orig, "pgcode", None) != QUERY_CANCELED:
+            raise
+        return None
+
+
+def search_facets(query, fuzzy=False, threshold=None):
+    """
+    Counts the audiobooks matching a search by category, by author (the top
+    SEARCH_FACET_TOP_AUTHORS) and by duration bucket.
+
+    All facets come from one grouped statement over the matched IDs, capped
+    at SEARCH_FACET_MAX_MATCHES rows and cancelled after
+    SEARCH_FACET_TIMEOUT_MS. Results are cached per query until the catalog
+    changes; a cancelled computation is not cached.
+
+    Args:
+        query (str): The user's search string.
+        fuzzy (bool): Facet the fuzzy match set instead of the full-text one.
+        threshold (float): Minimum word similarity for fuzzy mode.
+
+    Returns:
+        dict: The facets, or None when the time budget ran out.
+    """
+    if fuzzy and len(query.strip()) < FUZZY_MIN_QUERY_LENGTH:
+        return {
+            "categories": [],
+            "authors": [],
+            "durations": [{"bucket": b, "count": 0} for b in DURATION_BUCKETS],
+            "matched": 0,
+            "approximate": False,
+        }
+
+    max_matches = int(os.getenv("SEARCH_FACET_MAX_MATCHES", 10000))
+    top_authors = int(os.getenv("SEARCH_FACET_TOP_AUTHORS", 10))
+    timeout_ms = int(os.getenv("SEARCH_FACET_TIMEOUT_MS", 250))
+    threshold = fuzzy_threshold(threshold) if fuzzy else None
+
+    def compute():
+        if fuzzy:
+            # Same transaction-scoped threshold the page query uses
+            db.session.execute(
+                db.text(
+                    "SELECT set_config('pg_trgm.word_similarity_threshold', :t, true)"
+                ),
+                {"t": str(threshold)},
+            )
+            matches = FUZZY_MATCHES_SQL
+        else:
+            matches = FULL_TEXT_MATCHES_SQL
+        rows = _facet_rows(
+            FACETS_SQL.format(matches=matches),
+            {
+                "q": query,
+                "config": SEARCH_CONFIG,
+                "max_matches": max_matches,
+                "top_authors": top_authors,
+            },
+            timeout_ms,
+        )
+        if rows is None:
+            current_app.logger.warning(
+                f"Facets for '{query}' exceeded {timeout_ms} ms and were skipped"
+            )
+            return None
+
+        facets = {"categories": [], "authors": [], "durations": []}
+        durations = dict.fromkeys(DURATION_BUCKETS, 0)
+        matched = 0
+        for row in rows:
+            if row.facet == "matched":
+                matched = row.count
+            elif row.facet == "category":
+                facets["categories"].append(
+                    {"id": row.id, "name": row.name, "count": row.count}
+                )
+            elif row.facet == "author":
+                facets["authors"].append(
+                    {"id": row.id, "name": row.name, "count": row.count}
+                )
+            else:
+                durations[row.name] = row.count
+        facets["categories"].sort(key=lambda f: (-f["count"], f["name"]))
+        facets["authors"].sort(key=lambda f: (-f["count"], f["name"]))
+        facets["durations"] = [
+            {"bucket": bucket, "count": count} for bucket, count in durations.items()
+        ]
+        facets["matched"] = matched
+        # Counts cover only the first max_matches hits when the cap was reached
+        facets["approximate"] = matched >= max_matches
+        return facets
+
+    key = f"facets:{'fuzzy' if fuzzy else 'fts'}:{threshold}:{query.strip().lower()}"
+    return catalog_cache.get_or_set(key, compute)
@@ -0,0 +1,193 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from flask_app.modules.extensions import db
+
+SEEN_FILTER_KINDS = ("set", "sorted", "bloom")
+
+# Every video the crawler has already dealt with, stored or skipped
+KNOWN_VIDEO_IDS_SQL = db.text("""
+    SELECT video_id FROM audiobooks
+    UNION ALL
+    SELECT video_id FROM skipped_videos
+""")
+
+KNOWN_VIDEO_COUNT_SQL = db.text("""
+    SELECT (SELECT count(*) FROM audiobooks) + (SELECT count(*) FROM skipped_videos)
+""")
+
+
+def video_hash(video_id):
+    """A 64-bit hash of a video ID; collisions are negligible below billions of IDs."""
+    return int.from_bytes(
+        hashlib.blake2b(video_id.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HashSetFilter:
+    """Exact filter over the video ID strings themselves. Fastest, largest."""
+
+    def __init__(self, video_ids=()):
+        self.ids = set(video_ids)
+
+    def add(self, video_id):
+        self.ids.add(video_id)
+
+    def __contains__(self, video_id):
+        return video_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class SortedHashFilter:
+    """
+    64-bit hashes of the video IDs in one sorted array, 8 bytes per ID,
+    searched with bisect. IDs added after loading go to a small set.
+
+    The array is built bucket by bucket on the hash's top byte, so only
+    one bucket at a time is ever held as a Python list.
+    """
+
+    def __init__(self, video_ids=()):
+        buckets = [array("Q") for _ in range(256)]
+        for video_id in video_ids:
+            h = video_hash(video_id)
+            buckets[h >> 56].append(h)
+        self.hashes = array("Q")
+        for bucket in buckets:
+            self.hashes.extend(sorted(bucket))
+            del bucket[:]
+        self.added = set()
+
+    def add(self, video_id):
+        self.added.add(video_hash(video_id))
+
+    def __contains__(self, video_id):
+        h = video_hash(video_id)
+        if h in self.added:
+            return True
+        i = bisect_left(self.hashes, h)
+        return i < len(self.hashes) and self.hashes[i] == h
+
+    def __len__(self):
+        return len(self.hashes) + len(self.added)
+
+
+class BloomFilter:
+    """
+    Bloom filter sized for `capacity` IDs at `fp_rate` false positives:
+    about 1.2 bytes per ID at 1%. It never misses a known ID, but a new
+    video is taken for a seen one with probability fp_rate, and that rate
+    climbs once more than `capacity` IDs have been added.
+    """
+
+    def __init__(self, capacity, fp_rate=0.001, video_ids=()):
+        capacity = max(int(capacity), 1)
+        self.size = max(int(-capacity * math.log(fp_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+        for video_id in video_ids:
+            self._set(video_id)
+
+    def _positions(self, video_id):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(video_id.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def _set(self, video_id):
+        for p in self._positions(video_id):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def add(self, video_id):
+        with self._lock:
+            self._set(video_id)
+
+    def __contains__(self, video_id):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(video_id))
+
+    def __len__(self):
+        return self.count
+
+
+def build_filter(kind, video_ids, expected=0, fp_rate=0.001):
+    """
+    Builds a seen-video filter.
+
+    Args:
+        kind (str): One of SEEN_FILTER_KINDS.
+        video_ids (iterable): The known video IDs.
+        expected (int): Number of IDs, used to size a Bloom filter.
+        fp_rate (float): Bloom filter false-positive rate.
+
+    Returns:
+        The filter, supporting ``in``, add() and len().
+    """
+    if kind == "set":
+        return HashSetFilter(video_ids)
+    if kind == "sorted":
+        return SortedHashFilter(video_ids)
+    if kind == "bloom":
+        # Headroom for the videos this crawl will add
+        capacity = int(expected * 1.1) + 10000
+        return BloomFilter(capacity, fp_rate, video_ids)
+    raise ValueError(f"SEEN_FILTER must be one of: {', '.join(SEEN_FILTER_KINDS)}")
+
+
+class SeenVideos:
+    """
+    In-memory record of the video IDs already in audiobooks or
+    skipped_videos, loaded once when a crawl command starts, so repeat
+    videos are rejected without a database round trip.
+
+    SEEN_FILTER picks the structure: "sorted" (default, exact for all
+    practical purposes at 8 bytes per ID), "set" (exact, several times
+    larger) or "bloom" (smallest, with SEEN_FILTER_FP_RATE of new videos
+    wrongly skipped). Videos stored or skipped during the crawl are added
+    as they are written.
+    """
+
+    def __init__(self):
+        self.filter = None
+
+    def load(self):
+        """Loads the filter from the database, unless it is already loaded."""
+        if self.filter is not None:
+            return
+        kind = os.getenv("SEEN_FILTER", "sorted").lower()
+        fp_rate = float(os.getenv("SEEN_FILTER_FP_RATE", 0.001))
+        started = time.perf_counter()
+        expected = 0
+        if kind == "bloom":
+            expected = db.session.execute(KNOWN_VIDEO_COUNT_SQL).scalar()
+        video_ids = db.session.execute(
+            KNOWN_VIDEO_IDS_SQL.execution_options(yield_per=50000)
+        ).scalars()
+        self.filter = build_filter(kind, video_ids, expected, fp_rate)
+        db.session.close()
+        print(
+            f"Loaded {len(self.filter)} seen video IDs into a {kind} filter "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+
+    def seen(self, video_id):
+        """Whether the video is known; always False before load()."""
+        return self.filter is not None and video_id in self.filter
+
+    def add(self, video_id):
+        """Records a video that has just been stored or skipped."""
+        if self.filter is not None:
+            self.filter.add(video_id)
+
+
+seen_videos = SeenVideos()
@@ -0,0 +1,105 @@
+from datetime import datetime
+from sqlalchemy import any_, func
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from flask_app.modules.extensions import db
+from flask_app.models import (
+    Audiobook,
+    Author,
+    Category,
+    audiobook_categories,
+    AUDIOBOOK_FIELDS,
+)
+
+# Category names per audiobook, aggregated in the database so each audiobook
+# comes back as one flat row instead of one row per category. Ordered by
+# category id to match the ORM relationship.
+CATEGORY_NAMES = (
+    db.select(func.array_agg(aggregate_order_by(Category.name, Category.id)))
+    .select_from(audiobook_categories)
+    .join(Category, Category.id == audiobook_categories.c.category_id)
+    .where(audiobook_categories.c.audiobook_id == Audiobook.id)
+    .correlate(Audiobook)
+    .scalar_subquery()
+)
+
+# Core expression selected for each serialized field
+FIELD_EXPRESSIONS = {
+    "id": Audiobook.id,
+    "video_id": Audiobook.video_id,
+    "title": Audiobook.title,
+    "description": Audiobook.description,
+    "thumbnail": Audiobook.thumbnail,
+    "author": Author.name,
+    "categories": CATEGORY_NAMES,
+    "duration": Audiobook.duration,
+    "timestamp": Audiobook.timestamp,
+}
+
+
+def audiobook_row_to_dict(row):
+    """
+    Builds the same dictionary as Audiobook.to_dict from a plain result row.
+
+    Args:
+        row (Row): A row selected by audiobook_dicts_in_order.
+
+    Returns:
+        dict: The serialized audiobook.
+    """
+    data = row._asdict()
+    if "categories" in data:
+        data["categories"] = data["categories"] or []
+    if "timestamp" in data:
+        timestamp = data["timestamp"]
+        data["timestamp"] = (
+            timestamp.isoformat() if isinstance(timestamp, datetime) else None
+        )
+    return data
+
+
+def audiobook_rows_select(fields):
+    """
+    Builds a Core select of the columns behind `fields`, one row per
+    audiobook, ready for audiobook_row_to_dict. Callers add their own
+    WHERE, ORDER BY and LIMIT clauses.
+
+    Args:
+        fields (tuple): Field names, in AUDIOBOOK_FIELDS order.
+
+    Returns:
+        Select: The statement.
+    """
+    stmt = db.select(
+        *(FIELD_EXPRESSIONS[name].label(name) for name in fields)
+    ).select_from(Audiobook)
+    if "author" in fields:
+        stmt = stmt.outerjoin(Author, Author.id == Audiobook.author_id)
+    return stmt
+
+
+def audiobook_dicts_in_order(ids, fields=None):
+    """
+    Serializes the audiobooks with the given IDs straight from Core rows,
+    preserving the ID order. No ORM instances are built and the identity map
+    is never touched; each audiobook is one row with its author name joined
+    and its category names aggregated with array_agg. The output matches
+    Audiobook.to_dict(fields) key for key.
+
+    Args:
+        ids (list): Audiobook IDs in the order they should be returned.
+        fields (tuple): Optional subset of AUDIOBOOK_FIELDS.
+
+    Returns:
+        list: One dict per audiobook found.
+    """
+    if not ids:
+        return []
+    fields = tuple(fields or AUDIOBOOK_FIELDS)
+    if "id" not in fields:
+        raise ValueError("fields must include id")
+
+    id_array = db.bindparam("ids", list(ids), type_=ARRAY(db.Integer))
+    stmt = audiobook_rows_select(fields).where(Audiobook.id == any_(id_array))
+    rows = db.session.execute(stmt).all()
+    by_id = {row.id: audiobook_row_to_dict(row) for row in rows}
+    return [by_id[audiobook_id] for audiobook_id in ids if audiobook_id in by_id]
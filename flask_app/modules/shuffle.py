@@ -0,0 +1,212 @@
+import hashlib
+import os
+import random
+import time
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook, audiobook_categories
+
+# Each probe jumps to a random point on the shuffle_key index and takes the
+# first row at or after it, wrapping around to the lowest key when it lands
+# past the last one, so a sample costs one index probe per row regardless
+# of catalog size
+SAMPLE_PROBE_SQL = """
+    SELECT hit.id
+    FROM unnest(CAST(:probes AS double precision[])) WITH ORDINALITY AS probe(key, n)
+    CROSS JOIN LATERAL (
+        (
+            SELECT audiobooks.id FROM audiobooks
+            WHERE audiobooks.shuffle_key >= probe.key
+            ORDER BY audiobooks.shuffle_key
+            LIMIT 1
+        )
+        UNION ALL
+        (
+            SELECT audiobooks.id FROM audiobooks
+            ORDER BY audiobooks.shuffle_key
+            LIMIT 1
+        )
+        LIMIT 1
+    ) AS hit
+    ORDER BY probe.n
+"""
+
+# The same within one category, probing the category's own range of the
+# (category_id, shuffle_key, audiobook_id) index on the link table, so a
+# sparse category costs no more per probe than the whole catalog
+SAMPLE_CATEGORY_PROBE_SQL = """
+    SELECT hit.id
+    FROM unnest(CAST(:probes AS double precision[])) WITH ORDINALITY AS probe(key, n)
+    CROSS JOIN LATERAL (
+        (
+            SELECT audiobook_categories.audiobook_id AS id FROM audiobook_categories
+            WHERE audiobook_categories.category_id = :category_id
+            AND audiobook_categories.shuffle_key >= probe.key
+            ORDER BY audiobook_categories.shuffle_key
+            LIMIT 1
+        )
+        UNION ALL
+        (
+            SELECT audiobook_categories.audiobook_id AS id FROM audiobook_categories
+            WHERE audiobook_categories.category_id = :category_id
+            ORDER BY audiobook_categories.shuffle_key
+            LIMIT 1
+        )
+        LIMIT 1
+    ) AS hit
+    ORDER BY probe.n
+"""
+
+# Probe rounds before falling back to sorting the remainder
+SAMPLE_PROBE_ROUNDS = 3
+
+
+def scheduled_seed():
+    """
+    Returns the default shuffle seed. The seed changes every
+    SHUFFLE_ROTATE_SECONDS (one day by default), so the catalog order
+    rotates on a schedule while staying stable between rotations.
+    """
+    period = max(int(os.getenv("SHUFFLE_ROTATE_SECONDS", 86400)), 1)
+    return str(int(time.time()) // period)
+
+
+def seed_offset(seed):
+    """
+    Maps a seed to a starting point in [0, 1) on the shuffle_key line.
+
+    Args:
+        seed (str): Any string seed.
+
+    Returns:
+        float: The offset the seeded order starts from.
+    """
+    digest = hashlib.sha1(str(seed).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+def _phase_filter(phase, offset):
+    # Phase 0 walks the keys from the seed's offset up to 1.0,
+    # phase 1 wraps around and walks 0.0 up to the offset
+    if phase == 0:
+        return Audiobook.shuffle_key >= offset
+    return Audiobook.shuffle_key < offset
+
+
+def shuffled_page_ids(seed, per_page, position=None, skip=0):
+    """
+    Fetches one page of audiobook IDs in the seeded shuffle order.
+
+    The order is the (shuffle_key, id) index rotated to start at the
+    seed's offset, so each page is at most two index range scans and the
+    same seed always yields the same sequence without overlaps or gaps.
+
+    Args:
+        seed (str): The shuffle seed.
+        per_page (int): Number of IDs to return.
+        position (dict): Keyset position from a previous page
+                         ({"p": phase, "k": shuffle_key, "i": id}), checked
+                         against pagination.SHUFFLE_CURSOR, or None.
+        skip (int): Rows to skip when no position is given (legacy page=N).
+
+    Returns:
+        tuple: (ids, next_position) where next_position is None on the last page.
+    """
+    offset = seed_offset(seed)
+    phase = 0
+    after = None
+    if position:
+        phase = position["p"]
+        after = (position["k"], position["i"])
+
+    rows = []
+    while phase < 2 and len(rows) <= per_page:
+        stmt = db.select(Audiobook.id, Audiobook.shuffle_key).where(
+            _phase_filter(phase, offset)
+        )
+        if after:
+            stmt = stmt.where(
+                tuple_(Audiobook.shuffle_key, Audiobook.id) > tuple_(*after)
+            )
+        stmt = stmt.order_by(Audiobook.shuffle_key, Audiobook.id).limit(
+            per_page + 1 - len(rows)
+        )
+        if skip:
+            stmt = stmt.offset(skip)
+
+        batch = db.session.execute(stmt).all()
+        rows.extend((phase, row.shuffle_key, row.id) for row in batch)
+
+        if skip and len(rows) <= per_page:
+            # Work out how much of the skip this phase consumed before
+            # carrying the remainder into the wrapped phase
+            phase_total = db.session.execute(
+                db.select(func.count()).where(_phase_filter(phase, offset))
+            ).scalar()
+            skip = max(skip - phase_total, 0)
+
+        phase += 1
+        after = None
+
+    next_position = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_phase, last_key, last_id = rows[-1]
+        next_position = {"p": last_phase, "k": last_key, "i": last_id}
+
+    return [row_id for _, _, row_id in rows], next_position
+
+
+def sample_audiobook_ids(number, category_id=None):
+    """
+    Picks up to `number` distinct random audiobook IDs.
+
+    Random probes into the shuffle_key index (twice as many as still
+    needed, to absorb probes that land on the same row) keep the cost flat
+    as the catalog grows; a category is probed on its own index range.
+    Rows hit twice are replaced by further rounds of probes. Only when
+    those cannot find enough distinct rows, which happens when the table or
+    category holds about `number` rows or fewer, does it top up with an
+    ORDER BY random() over that small remainder.
+
+    Args:
+        number (int): How many IDs to return.
+        category_id (int): Optionally restrict the sample to one category.
+
+    Returns:
+        list: Distinct audiobook IDs in random order.
+    """
+    if category_id is None:
+        stmt = db.text(SAMPLE_PROBE_SQL)
+        params = {}
+    else:
+        stmt = db.text(SAMPLE_CATEGORY_PROBE_SQL)
+        params = {"category_id": category_id}
+
+    ids = []
+    seen = set()
+    for _ in range(SAMPLE_PROBE_ROUNDS):
+        params["probes"] = [random.random() for _ in range((number - len(ids)) * 2)]
+        for row in db.session.execute(stmt, params):
+            if row.id not in seen:
+                seen.add(row.id)
+                ids.append(row.id)
+            if len(ids) == number:
+                return ids
+        if not seen:
+            # Nothing to sample from
+            return ids
+
+    # Not enough distinct rows reachable by probing; the pool must be small
+    remainder = db.select(Audiobook.id).where(
+        Audiobook.id != func.all(db.bindparam("found", ids, type_=ARRAY(db.Integer)))
+    )
+    if category_id is not None:
+        remainder = remainder.join(
+            audiobook_categories,
+            audiobook_categories.c.audiobook_id == Audiobook.id,
+        ).where(audiobook_categories.c.category_id == category_id)
+    remainder = remainder.order_by(func.random()).limit(number - len(ids))
+    ids.extend(db.session.execute(remainder).scalars().all())
+    return ids
@@ -0,0 +1,171 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+import traceback
+from collections import deque
+from datetime import datetime, timezone
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from flask_app.modules.request_timing import fingerprint
+
+ROUTES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "routes")
+
+# Blueprints whose query parameters are never recorded (credentials)
+EXCLUDED_BLUEPRINTS = ("auth",)
+
+
+def _route_frame():
+    # The innermost stack frame in flask_app/routes, i.e. the view line
+    # that issued the statement
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(ROUTES_DIR):
+            path = os.path.relpath(frame.filename, os.path.dirname(ROUTES_DIR))
+            return f"{path}:{frame.lineno} {frame.name}"
+    return None
+
+
+def _short_repr(value, limit=200):
+    text = repr(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+class SlowQueryLog:
+    """
+    Opt-in capture of slow API statements, enabled by setting SLOW_QUERY_MS.
+
+    Any statement that takes longer than SLOW_QUERY_MS while serving a
+    request, and was issued from a view in flask_app/routes, is recorded
+    with its fingerprint, parameters and source line in a ring buffer of
+    the last SLOW_QUERY_BUFFER entries.
+
+    A sampled subset (SLOW_QUERY_EXPLAIN_SAMPLE, at most once per
+    fingerprint every SLOW_QUERY_EXPLAIN_INTERVAL seconds) is re-run by a
+    background thread under EXPLAIN (ANALYZE, BUFFERS), inside a rolled
+    back transaction limited by SLOW_QUERY_EXPLAIN_TIMEOUT_MS. Only SELECT
+    statements are explained, since ANALYZE executes the statement.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.entries = deque(maxlen=100)
+        self._queue = None
+        self._thread = None
+        self._last_explained = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.threshold_ms = float(os.getenv("SLOW_QUERY_MS", 0))
+        self.enabled = self.threshold_ms > 0
+        self.sample_rate = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1))
+        self.explain_interval = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL", 60))
+        self.explain_timeout_ms = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 10000))
+        self.entries = deque(maxlen=int(os.getenv("SLOW_QUERY_BUFFER", 100)))
+        app.extensions["slow_queries"] = self
+
+        if self.enabled and not event.contains(
+            Engine, "after_cursor_execute", self._after_cursor_execute
+        ):
+            event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def recent(self):
+        """
+        Returns:
+            list: Captured slow statements, newest first.
+        """
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            conn.info["slow_query_started"] = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop("slow_query_started", None)
+        if started is None:
+            return
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        source = _route_frame()
+        if source is None:
+            return
+
+        record_params = request.blueprint not in EXCLUDED_BLUEPRINTS
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 1),
+            "fingerprint": fingerprint(statement),
+            "statement": statement,
+            "parameters": _short_repr(parameters) if record_params else None,
+            "endpoint": request.endpoint,
+            "source": source,
+            "bind": g.get("db_replica") or "primary",
+            "plan": None,
+        }
+        with self._lock:
+            self.entries.append(entry)
+
+        if (
+            record_params
+            and not executemany
+            and self._should_explain(entry["fingerprint"], statement)
+        ):
+            self._enqueue(conn.engine, statement, parameters, entry)
+
+    def _should_explain(self, fp, statement):
+        if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            return False
+        if random.random() >= self.sample_rate:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_explained.get(fp, float("-inf")) < self.explain_interval:
+                return False
+            self._last_explained[fp] = now
+        return True
+
+    def _enqueue(self, engine, statement, parameters, entry):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._queue = queue.Queue(maxsize=32)
+                    self._thread = threading.Thread(
+                        target=self._explain_forever, name="slow-query-explain", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self._queue.put_nowait((engine, statement, parameters, entry))
+        except queue.Full:
+            pass
+
+    def _explain_forever(self):
+        while True:
+            engine, statement, parameters, entry = self._queue.get()
+            try:
+                entry["plan"] = self._explain(engine, statement, parameters)
+            except Exception as e:
+                entry["plan"] = {"error": str(e)}
+
+    def _explain(self, engine, statement, parameters):
+        with engine.connect() as conn:
+            with conn.begin() as transaction:
+                conn.exec_driver_sql(
+                    f"SET LOCAL statement_timeout = {self.explain_timeout_ms}"
+                )
+                plan = conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters
+                ).scalar()
+                transaction.rollback()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]
+
+
+slow_queries = SlowQueryLog()
@@ -0,0 +1,315 @@
+import heapq
+import os
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from flask import current_app
+from flask_app.modules.extensions import db
+from flask_app.models import Audiobook, Author, user_favorites
+from flask_app.modules.cache import catalog_cache
+
+KINDS = ("title", "author")
+
+# Titles are also indexed without a leading article, so "hobbit" finds
+# "The Hobbit"
+LEADING_ARTICLE = re.compile(r"^(the|a|an)\s+")
+
+# Prefixes up to this length match so many entries that their top-k lists
+# are memoized per index instead of being recomputed on every keystroke
+MEMO_PREFIX_LENGTH = 3
+
+# Cap on memoized prefixes per index; arbitrary short prefixes (any
+# characters, any limit) would otherwise grow the memo without bound
+MEMO_MAX_ENTRIES = 4096
+
+
+def normalize(text):
+    """Lowercases and collapses whitespace so lookups ignore case and spacing."""
+    return " ".join(text.lower().split())
+
+
+def index_keys(kind, label):
+    """Returns the normalized keys an entry is reachable under."""
+    key = normalize(label)
+    keys = [key]
+    if kind == "title":
+        stripped = LEADING_ARTICLE.sub("", key)
+        if stripped and stripped != key:
+            keys.append(stripped)
+    return keys
+
+
+class SuggestIndex:
+    """
+    Immutable prefix index over (key, entry) pairs kept in a sorted list.
+
+    A prefix lookup is a bisect to the first key at or after the prefix and
+    a scan of the contiguous run of keys that start with it; the top-k of
+    that run by popularity is returned. Entry data lives in flat arrays
+    rather than per-entry objects to keep the footprint small at millions
+    of entries.
+    """
+
+    def __init__(self, rows=()):
+        """
+        Args:
+            rows (iterable): (key, label, kind, id, popularity) tuples,
+                             sorted by key.
+        """
+        self.keys = []
+        self.labels = []
+        self.kinds = array("b")
+        self.ids = array("l")
+        self.popularity = array("l")
+        for key, label, kind, entry_id, popularity in rows:
+            self.keys.append(key)
+            self.labels.append(label)
+            self.kinds.append(kind)
+            self.ids.append(entry_id)
+            self.popularity.append(popularity)
+        # Catalog generation the rows were read at, set by Suggester
+        self.generation = None
+        self._memo = {}
+        self._memo_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def rows(self):
+        """Iterates the index as (key, label, kind, id, popularity) tuples."""
+        return zip(self.keys, self.labels, self.kinds, self.ids, self.popularity)
+
+    @classmethod
+    def from_entries(cls, entries):
+        """
+        Builds an index from unsorted entries.
+
+        Args:
+            entries (iterable): (label, kind, id, popularity) tuples, kind
+                                being an index into KINDS.
+        """
+        return cls(sorted(_expand(entries)))
+
+    def merged(self, entries):
+        """
+        Returns a new index holding this index's rows plus `entries`, merging
+        the two sorted runs in linear time instead of re-sorting everything.
+        """
+        return SuggestIndex(heapq.merge(self.rows(), sorted(_expand(entries))))
+
+    def search(self, prefix, limit=8):
+        """
+        Returns up to `limit` entries whose key starts with `prefix`, most
+        popular first, one per (kind, id).
+
+        Args:
+            prefix (str): What the user has typed so far.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            list: Dicts with type, id and label.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        memoize = len(prefix) <= MEMO_PREFIX_LENGTH
+        if memoize:
+            cached = self._memo.get((prefix, limit))
+            if cached is not None:
+                return cached
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + "\uffff", lo=start)
+        # An entry can match under two keys; over-fetch so dropping the
+        # repeat never leaves the list short
+        best = heapq.nlargest(
+            limit * 2,
+            range(start, end),
+            key=lambda i: (self.popularity[i], -self.ids[i]),
+        )
+
+        seen = set()
+        results = []
+        for i in best:
+            identity = (self.kinds[i], self.ids[i])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            results.append(
+                {"type": KINDS[self.kinds[i]], "id": self.ids[i], "label": self.labels[i]}
+            )
+            if len(results) == limit:
+                break
+
+        if memoize:
+            with self._memo_lock:
+                if len(self._memo) >= MEMO_MAX_ENTRIES:
+                    # Evict the oldest entry
+                    del self._memo[next(iter(self._memo))]
+                self._memo[(prefix, limit)] = results
+        return results
+
+    def warm(self, limit=8):
+        """
+        Memoizes every single-character prefix, the widest and slowest
+        lookups, so the first keystroke after a rebuild is not the one that
+        pays for scanning a large run.
+        """
+        i = 0
+        while i < len(self.keys):
+            first = self.keys[i][0]
+            self.search(first, limit)
+            i = bisect_left(self.keys, first + "\uffff", lo=i)
+
+
+def _expand(entries):
+    for label, kind, entry_id, popularity in entries:
+        if not label:
+            continue
+        for key in index_keys(KINDS[kind], label):
+            yield key, label, kind, entry_id, popularity
+
+
+def _title_entries(after_id, up_to):
+    # Title popularity is how many users have favorited the audiobook
+    favorites = (
+        db.select(
+            user_favorites.c.audiobook_id, db.func.count().label("favorites")
+        )
+        .group_by(user_favorites.c.audiobook_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(
+            Audiobook.id,
+            Audiobook.title,
+            db.func.coalesce(favorites.c.favorites, 0),
+        )
+        .outerjoin(favorites, favorites.c.audiobook_id == Audiobook.id)
+        .where(Audiobook.id > after_id, Audiobook.id <= up_to)
+    )
+    return [(title, KINDS.index("title"), row_id, count) for row_id, title, count in rows]
+
+
+def _author_entries(after_id, up_to):
+    # Author popularity is how many audiobooks they have in the catalog
+    books = (
+        db.select(Audiobook.author_id, db.func.count().label("books"))
+        .group_by(Audiobook.author_id)
+        .subquery()
+    )
+    rows = db.session.execute(
+        db.select(Author.id, Author.name, db.func.coalesce(books.c.books, 0))
+        .outerjoin(books, books.c.author_id == Author.id)
+        .where(Author.id > after_id, Author.id <= up_to)
+    )
+    return [(name, KINDS.index("author"), row_id, count) for row_id, name, count in rows]
+
+
+class Suggester:
+    """
+    Keeps a SuggestIndex in step with the catalog generation.
+
+    On a generation change, rows added since the last build (by id
+    watermark) are merged into a new index. Deletions and popularity drift
+    are picked up by a full rebuild, which happens when the row counts no
+    longer line up or when the index is older than
+    SUGGEST_FULL_REBUILD_SECONDS at a generation change.
+
+    Only the very first build runs on a request thread. Later refreshes run
+    in a background thread, one at a time, while requests keep using the
+    previous index until the new one is swapped in.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.generation = None
+        self.built_at = 0.0
+        self.watermarks = {"title": 0, "author": 0}
+        self.counts = {"title": 0, "author": 0}
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Returns the latest complete index, refreshing it if it is behind."""
+        generation = catalog_cache.generation()
+        if self.index is not None and generation == self.generation:
+            return self.index
+
+        if self.index is None:
+            with self._lock:
+                if self.index is None:
+                    self._refresh()
+            return self.index
+
+        # Another thread already refreshing will pick up this generation
+        # on its next round
+        if self._lock.acquire(blocking=False):
+            threading.Thread(
+                target=self._refresh_in_background,
+                args=(current_app._get_current_object(),),
+                name="suggest-refresh",
+                daemon=True,
+            ).start()
+        return self.index
+
+    def _refresh_in_background(self, app):
+        # Runs with the lock held by current()
+        try:
+            with app.app_context():
+                try:
+                    self._refresh()
+                except Exception as e:
+                    app.logger.warning(f"Suggest index refresh failed: {e}")
+                finally:
+                    db.session.remove()
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        full_every = int(os.getenv("SUGGEST_FULL_REBUILD_SECONDS", 3600))
+        # Read the generation before the rows, so the index is never
+        # labelled newer than its contents
+        generation = catalog_cache.generation()
+        # Count and bound each table first; entries are then read up to the
+        # bound, so rows committed mid-refresh wait for the next one
+        counts = {}
+        watermarks = {}
+        for kind, model in (("title", Audiobook), ("author", Author)):
+            counts[kind], watermarks[kind] = db.session.execute(
+                db.select(db.func.count(model.id), db.func.coalesce(db.func.max(model.id), 0))
+            ).one()
+
+        incremental = (
+            self.index is not None
+            and time.monotonic() - self.built_at < full_every
+        )
+        if incremental:
+            new_titles = _title_entries(self.watermarks["title"], watermarks["title"])
+            new_authors = _author_entries(self.watermarks["author"], watermarks["author"])
+            # Anything other than pure additions (deletes, dedupes) needs a
+            # full rebuild
+            incremental = counts["title"] == self.counts["title"] + len(
+                new_titles
+            ) and counts["author"] == self.counts["author"] + len(new_authors)
+
+        if incremental:
+            index = self.index.merged(new_titles + new_authors)
+        else:
+            index = SuggestIndex.from_entries(
+                _title_entries(0, watermarks["title"])
+                + _author_entries(0, watermarks["author"])
+            )
+            self.built_at = time.monotonic()
+        index.warm()
+        index.generation = generation
+
+        self.index = index
+        self.counts = counts
+        self.watermarks = watermarks
+        self.generation = generation
+
+
+suggester = Suggester()
@@ -1,11 +1,13 @@
 import random
 import re
 import os
+import threading
+from flask import current_app
 from playwright.sync_api import sync_playwright
 from playwright_stealth import stealth_sync
 from flask_app.modules.user_agent_generator import ValidUAGenerator
 from flask_app.modules.book import (
-    check_if_book_exists,
+    existing_video_ids,
     store_book_info,
     process_book_name,
     ineligible_video,
@@ -19,6 +21,10 @@ from flask_app.modules.llm.book import (
 from flask_app.modules.helpers import string_to_ascii
 from flask_app.modules.google_books import get_book_info
 from flask_app.modules.extensions import db
+from flask_app.modules.bulk_writer import bulk_writer
+from flask_app.modules.metrics import VIDEOS_SEEN
+from flask_app.modules.pipeline import Stage, StagedPipeline
+from flask_app.modules.seen_videos import seen_videos
 import json
 
 
@@ -87,9 +93,10 @@ def convert_duration_to_seconds(duration_str):
         return 0  # Invalid format
 
 
-def process_video_elements(video_elements):
-    # Loop through each video element and print it
-
+def process_video_elements(video_elements, pipeline=None):
+    # Parse every video element in the batch first, so the whole batch can
+    # be checked against the database in one query
+    books = []
     for i, video in enumerate(video_elements):
         print(f"Video #{i+1}:")
         # Print the element (this will show a representation of the Playwright element)
@@ -122,47 +129,68 @@ def process_video_elements(video_elements):
 
         # Print the book dictionary as readable JSON
         print(f"Book: {json.dumps(book, indent=2)}")
-
-        if not __name__ == "__main__":  # only do this if we're running in flask
-            process_book_data(book)
         print("-------------------")
+        books.append(book)
+
+    if __name__ == "__main__":  # only store anything if we're running in flask
+        return
+
+    VIDEOS_SEEN.inc(len(books))
+    # Repeats are rejected in memory when the crawl command loaded the
+    # seen-video filter; only the rest are checked against the database,
+    # which also catches videos added by other processes since
+    unseen = []
+    for book in books:
+        if seen_videos.seen(book["video_id"]):
+            print(f"Video ID {book["video_id"]} already exists in the database.")
+        else:
+            unseen.append(book)
+    known = existing_video_ids(book["video_id"] for book in unseen)
+    # Release the connection before scrolling on
+    db.session.close()
+    for book in unseen:
+        if book["video_id"] in known:
+            print(f"Video ID {book["video_id"]} already exists in the database.")
+            seen_videos.add(book["video_id"])
+            continue
+        # Hand the book to the ingest workers so scrolling carries on while
+        # it is enriched; this only waits when the pipeline is backed up
+        if pipeline is not None:
+            pipeline.submit(book)
+        else:
+            process_book_data(book)
 
 
-def process_book_data(book):
-    # Check if the book already exists in the database
-    if check_if_book_exists(book["video_id"]):
-        print(f"Video ID {book["video_id"]} already exists in the database.")
-        return False
-
+def filter_new_video(book):
+    """
+    Ingest stage 1: drops videos too short to be an audiobook. Videos
+    already in the database were dropped by process_video_elements, which
+    checks a whole scroll batch at once.
+    """
     # check if the video is too short to be an audiobook
     if book["duration"] < int(os.getenv("MIN_BOOK_DURATION", 0)):
         ineligible_video(book["video_id"], "Too short")
-        return False
+        return None
+    return book
 
-    # check that this video is in english
-    book_info = {}
-    language_context = string_to_ascii(book["title"]) + string_to_ascii(
-        book["description"]
-    )
-    is_english = guess_book_language(language_context)
-    if not is_english:
-        ineligible_video(book["video_id"], "Not in English (det. by LLM)")
-        return False
 
+def identify_book(book):
+    """
+    Ingest stage 2 (LLM): checks the video is in English, then parses a
+    book title and author out of the video title and description.
+    """
     # use an LLM to try to determine if the book title and description are in English
     # if not, skip the video
-    book_info = {}
     language_context = string_to_ascii(book["title"]) + string_to_ascii(
         book["description"]
     )
     is_english = guess_book_language(language_context)
     if not is_english:
         ineligible_video(book["video_id"], "Not in English (det. by LLM)")
-        return False
+        return None
 
     # use an LLM to try to parse out a book title and author from the other
     # gobbledygook people add to the video title
-    book_info = {}
     guessed_book_details = guess_book_name(book["title"])
     if guessed_book_details:
         book["author"] = guessed_book_details.get("author")
@@ -172,7 +200,14 @@ def process_book_data(book):
     if not book["author"] or book["author"].lower() == "unknown":
         author_context = string_to_ascii(book["description"])
         book["author"] = guess_book_author(author_context)
+    return book
 
+
+def reconcile_book(book):
+    """
+    Ingest stage 3 (HTTP): prefers standardized details from Google Books,
+    and drops books that still have no author.
+    """
     # try the google books api to get standardized book info
     # if book info is returned, prefer it over anything we have so far
     book_info = get_book_info(book["title"], book["author"])
@@ -186,16 +221,82 @@ def process_book_data(book):
     # if no author is available at this point it's likely a garbage book, skip to next
     if not book["author"] or book["author"].lower() == "unknown":
         ineligible_video(book["video_id"], "No author found")
-        return False
+        return None
+    return book
+
 
-    # guess categories from the description
+def classify_book(book):
+    """Ingest stage 4 (LLM): guesses categories from the final description."""
     categories_context = book["title"] + string_to_ascii(book["description"])
     book["categories"] = guess_book_categories(categories_context)
+    return book
+
 
+def store_book(book):
+    """
+    Ingest stage 5: stores the book. During a crawl it is buffered, and
+    this stage is the one that flushes the bulk writer.
+    """
     print(f"Book: {json.dumps(book, indent=2)}")
+    stored = store_book_info(book)
+    if bulk_writer.active:
+        bulk_writer.flush_if_due()
+    return book if stored else None
+
+
+INGEST_STAGES = (
+    filter_new_video,
+    identify_book,
+    reconcile_book,
+    classify_book,
+    store_book,
+)
+
+
+def process_book_data(book):
+    """
+    Runs one video through every ingest stage inline. Callers drop videos
+    that are already known first (see existing_video_ids).
+    """
+    for stage in INGEST_STAGES:
+        book = stage(book)
+        if book is None:
+            return False
+    return True
 
-    # Store the processed book data
-    return store_book_info(book)
+
+def ingest_pipeline(app):
+    """
+    Builds the threaded ingest pipeline the crawler feeds while it keeps
+    scrolling. Each stage's worker count comes from INGEST_<STAGE>_WORKERS;
+    INGEST_LLM_SLOTS caps concurrent Ollama calls across the two LLM stages
+    and INGEST_QUEUE_SIZE bounds each stage's queue. Storing stays single
+    threaded, and it is the only stage that flushes the bulk writer (the
+    others just buffer skipped videos), so author and category
+    get-or-create never race and no other stage waits on a write.
+
+    Args:
+        app (Flask): The application, for the workers' app contexts.
+
+    Returns:
+        StagedPipeline: The running pipeline; close() it when crawling ends.
+    """
+    llm_slots = threading.BoundedSemaphore(int(os.getenv("INGEST_LLM_SLOTS", 2)))
+
+    def workers(name, default):
+        return int(os.getenv(f"INGEST_{name.upper()}_WORKERS", default))
+
+    return StagedPipeline(
+        app,
+        [
+            Stage("filter", filter_new_video, workers("filter", 1)),
+            Stage("identify", identify_book, workers("identify", 2), llm_slots),
+            Stage("reconcile", reconcile_book, workers("reconcile", 2)),
+            Stage("classify", classify_book, workers("classify", 2), llm_slots),
+            Stage("store", store_book, 1, idle=bulk_writer.flush_if_due),
+        ],
+        queue_size=int(os.getenv("INGEST_QUEUE_SIZE", 8)),
+    )
 
 
 def simulate_user_interaction(page):
@@ -258,19 +359,33 @@ def crawl_youtube(query, max_scrolls=30):
         # Simulate user interaction (optional)
         simulate_user_interaction(page)
 
-        # Get initial videos and process them
-        processed_ids = set()
-        load_and_process_new_videos(page, processed_ids)
-
-        # Continue scrolling and processing new videos
-        print("Scrolling to load more videos...")
-        scroll_and_process_new_videos(page, processed_ids, max_scrolls)
+        # Videos found while scrolling are enriched and stored by background
+        # workers, and written in batches; only when running in flask
+        pipeline = None
+        if not __name__ == "__main__":
+            bulk_writer.start()
+            pipeline = ingest_pipeline(current_app._get_current_object())
 
-        # Close the browser
-        browser.close()
+        try:
+            # Get initial videos and process them
+            processed_ids = set()
+            load_and_process_new_videos(page, processed_ids, pipeline)
+
+            # Continue scrolling and processing new videos
+            print("Scrolling to load more videos...")
+            scroll_and_process_new_videos(page, processed_ids, max_scrolls, pipeline)
+        finally:
+            # Close the browser, then wait for the queued videos to finish
+            browser.close()
+            if pipeline is not None:
+                try:
+                    pipeline.close()
+                finally:
+                    # Write what is still buffered
+                    bulk_writer.close()
 
 
-def load_and_process_new_videos(page, processed_ids):
+def load_and_process_new_videos(page, processed_ids, pipeline=None):
     # Get all current video elements
     video_elements = page.query_selector_all("ytd-video-renderer")
 
@@ -295,11 +410,11 @@ def load_and_process_new_videos(page, processed_ids):
 
     # Process only the new videos
     print(f"Found {len(new_videos)} new video elements.")
-    process_video_elements(new_videos)
+    process_video_elements(new_videos, pipeline)
     return len(new_videos)
 
 
-def scroll_and_process_new_videos(page, processed_ids, max_scrolls=30):
+def scroll_and_process_new_videos(page, processed_ids, max_scrolls=30, pipeline=None):
     """Scroll down and process new videos that appear, limited by max_scrolls"""
 
     for scroll_count in range(max_scrolls):
@@ -310,7 +425,7 @@ def scroll_and_process_new_videos(page, processed_ids, max_scrolls=30):
         page.wait_for_timeout(random.randint(1500, 4000))
 
         # Find and process any new videos
-        new_count = load_and_process_new_videos(page, processed_ids)
+        new_count = load_and_process_new_videos(page, processed_ids, pipeline)
 
         print(f"Scroll #{scroll_count + 1}: Processed {new_count} new videos")
 
@@ -321,7 +436,7 @@ def scroll_and_process_new_videos(page, processed_ids, max_scrolls=30):
             )
             # Try one more time with a longer wait
             page.wait_for_timeout(random.randint(3000, 5500))
-            new_count = load_and_process_new_videos(page, processed_ids)
+            new_count = load_and_process_new_videos(page, processed_ids, pipeline)
             if new_count == 0:
                 print("Still no new videos. Stopping scrolling.")
                 break
@@ -0,0 +1,46 @@
+import hmac
+import os
+from flask import Blueprint, jsonify, request, abort
+from flask_app.modules.extensions import db
+from flask_app.modules.database import pool_stats, pgbouncer_mode
+from flask_app.modules.slow_queries import slow_queries
+
+admin = Blueprint("admin", __name__, url_prefix="/api/admin")
+
+
+@admin.before_request
+def require_admin_token():
+    # The admin endpoints exist only when ADMIN_TOKEN is set, and expect it
+    # as a bearer token
+    token = os.getenv("ADMIN_TOKEN")
+    if not token:
+        abort(404)
+    supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        abort(401)
+
+
+@admin.route("/pool", methods=["GET"])
+def get_pool_stats():
+    """Connection pool occupancy, checkout waits and timeouts per bind."""
+    return jsonify({"pgbouncer": pgbouncer_mode(), "pools": pool_stats(db.engines)})
+
+
+@admin.route("/slow-queries", methods=["GET"])
+def get_slow_queries():
+    """Recent slow API statements, newest first, with any sampled plans."""
+    return jsonify({
+        "enabled": slow_queries.enabled,
+        "threshold_ms": slow_queries.threshold_ms if slow_queries.enabled else None,
+        "queries": slow_queries.recent(),
+    })
+
+
+@admin.errorhandler(401)
+def unauthorized(error):
+    return jsonify({"error": "Unauthorized"}), 401
+
+
+@admin.errorhandler(404)
+def not_found(error):
+    return jsonify({"error": "Resource not found"}), 404
@@ -1,12 +1,126 @@
-from flask import Blueprint, jsonify, request, abort, current_app
-from flask_app.models import Audiobook, Category, Author
+from flask import Blueprint, jsonify, request, current_app
+from flask_app.models import Audiobook, Category, Author, AUDIOBOOK_FIELDS, audiobook_categories
 from flask_app.modules.extensions import db
-from sqlalchemy import or_, func
-import random
+from flask_app.modules.pagination import (
+    encode_cursor,
+    parse_cursor,
+    SHUFFLE_CURSOR,
+    AUTHOR_NAME_CURSOR,
+    AUTHOR_BOOKS_CURSOR,
+)
+from flask_app.modules.shuffle import (
+    scheduled_seed,
+    shuffled_page_ids,
+    sample_audiobook_ids,
+)
+from flask_app.modules.search import (
+    full_text_page_ids,
+    fuzzy_page_ids,
+    search_facets,
+    QUERY_CANCELED,
+)
+from flask_app.modules.suggest import suggester
+from flask_app.modules.homepage import homepage_snapshots
+from flask_app.modules.routing import use_replica_for_reads, add_route_header
+from flask_app.modules.database import statement_timeout
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.http_cache import conditional, public_cache_control
+from flask_app.modules.projection import requested_fields, projection_options
+from flask_app.modules.serialize import audiobook_dicts_in_order
+from flask_app.modules.counting import (
+    count_mode,
+    estimate_table_rows,
+    filtered_total,
+    pagination_info,
+)
+from flask_app.modules.authors import author_page, top_authors, author_audiobook_ids
+from sqlalchemy.exc import OperationalError
+import re
 
 api = Blueprint("api", __name__, url_prefix="/api")
+api.before_request(use_replica_for_reads)
+api.after_request(add_route_header)
+
+
+def categories_etag():
+    return f"categories-{catalog_cache.generation()}"
+
+
+def category_etag(category_id):
+    return f"category-{category_id}-{catalog_cache.generation()}"
+
+
+def authors_etag():
+    return f"authors-{catalog_cache.generation()}"
+
+
+def author_etag(author_id):
+    return f"author-{author_id}-{catalog_cache.generation()}"
+
+
+def suggest_etag():
+    # Tag with the generation of the index actually served, which trails
+    # the catalog's while a refresh runs in the background. The index only
+    # moves forward, so the view never answers from one older than this tag
+    return f"suggest-{suggester.current().generation}"
+
+
+def audiobook_etag(audiobook_id):
+    # A primary-key lookup of one column; no ORM instance is built
+    timestamp = db.session.execute(
+        db.select(Audiobook.timestamp).where(Audiobook.id == audiobook_id)
+    ).scalar()
+    if timestamp is None:
+        return None
+    return (
+        f"audiobook-{audiobook_id}-{int(timestamp.timestamp() * 1000000)}"
+        f"-{catalog_cache.generation()}"
+    )
+
+
+def count_all_audiobooks():
+    """Total number of audiobooks, cached until the catalog changes."""
+    return catalog_cache.get_or_set(
+        "audiobook_count", lambda: Audiobook.query.count()
+    )
+
+
+def audiobook_total(mode):
+    """Total number of audiobooks for the given count mode."""
+    if mode == "none":
+        return None
+    if mode == "estimate":
+        # Fall back to the cached exact count until the table is analyzed
+        estimate = estimate_table_rows(Audiobook.__tablename__)
+        if estimate is not None:
+            return estimate
+    return count_all_audiobooks()
+
+
+@api.route("/homepage", methods=["GET"])
+def get_homepage():
+    """Everything the homepage shows, in one precomputed response.
+
+    The bundle is serialized and compressed ahead of time and kept in
+    memory, so serving it does no database work.
+    """
+    snapshot = homepage_snapshots.current()
+    compressed = "gzip" in request.accept_encodings
+
+    response = current_app.response_class(
+        snapshot.gzip_body if compressed else snapshot.body,
+        mimetype="application/json",
+    )
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    response.set_etag(f"{snapshot.etag}-gz" if compressed else snapshot.etag)
+    response.headers["Cache-Control"] = public_cache_control()
+    return response.make_conditional(request)
 
 @api.route("/categories", methods=["GET"])
+@conditional(categories_etag)
+@catalog_cache.cached_view("categories")
 def get_categories():
     """Get all categories."""
     categories = Category.query.order_by(Category.sort_order).all()
@@ -16,169 +130,367 @@ def get_categories():
     })
 
 @api.route("/categories/<int:category_id>", methods=["GET"])
+@conditional(category_etag)
 def get_category_audiobooks(category_id):
-    """Get a category and its audiobooks with pagination."""
+    """Get a category and its audiobooks with pagination.
+
+    ``count=exact`` (the default) returns a total cached per category until
+    the catalog changes, ``count=estimate`` a planner estimate and
+    ``count=none`` no total, only ``has_next``.
+    """
     # Get pagination parameters
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
+    mode = count_mode()
     
     # Limit per_page to reasonable values
     per_page = min(max(per_page, 1), 50)
+    page = max(page, 1)
     
+    fields = requested_fields()
+
     # Get the category
     category = Category.query.get_or_404(category_id)
     
-    # Get paginated audiobooks for this category
-    audiobooks_query = category.audiobooks
-    total = audiobooks_query.count()
-    audiobooks_paginated = audiobooks_query.paginate(page=page, per_page=per_page, error_out=False)
+    # Get paginated audiobooks for this category; one extra ID tells
+    # whether another page follows without counting
+    members = db.select(audiobook_categories.c.audiobook_id).where(
+        audiobook_categories.c.category_id == category_id
+    )
+    ids = db.session.execute(
+        members.order_by(audiobook_categories.c.audiobook_id)
+        .limit(per_page + 1)
+        .offset((page - 1) * per_page)
+    ).scalars().all()
+    has_next = len(ids) > per_page
+    ids = ids[:per_page]
+
+    total = filtered_total(mode, members, f"category_total:{category_id}")
     
     return jsonify({
         "category": category.to_dict(),
-        "audiobooks": [audiobook.to_dict() for audiobook in audiobooks_paginated.items],
-        "pagination": {
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": audiobooks_paginated.pages,
-            "has_next": audiobooks_paginated.has_next
-        }
+        "audiobooks": audiobook_dicts_in_order(ids, fields),
+        "pagination": pagination_info(page, per_page, total, has_next, mode)
+    })
+
+@api.route("/authors", methods=["GET"])
+@statement_timeout("AUTHORS_STATEMENT_TIMEOUT_MS", 3000)
+@conditional(authors_etag)
+def get_authors():
+    """List authors with their audiobook counts.
+
+    ``sort=name`` (the default) pages through authors alphabetically by
+    keyset; pass the returned ``next_cursor`` back as ``cursor``.
+    ``sort=popular`` returns the ``per_page`` authors with the most
+    audiobooks, cached until the catalog changes.
+    """
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 100)
+    sort = request.args.get("sort", "name")
+
+    if sort == "popular":
+        authors = catalog_cache.get_or_set(
+            f"top_authors:{per_page}", lambda: top_authors(per_page)
+        )
+        return jsonify({"authors": authors, "next_cursor": None})
+    if sort != "name":
+        return jsonify({"error": "sort must be 'name' or 'popular'"}), 400
+
+    mode = count_mode()
+    try:
+        cursor = parse_cursor(request.args.get("cursor"), AUTHOR_NAME_CURSOR)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    authors, has_next = author_page(per_page, cursor["n"] if cursor else None)
+
+    if mode == "exact":
+        total = catalog_cache.get_or_set(
+            "author_count", lambda: Author.query.count()
+        )
+    elif mode == "estimate":
+        total = estimate_table_rows(Author.__tablename__)
+    else:
+        total = None
+
+    return jsonify({
+        "authors": authors,
+        "pagination": pagination_info(None, per_page, total, has_next, mode),
+        "next_cursor": encode_cursor({"n": authors[-1]["name"]}) if has_next else None
+    })
+
+@api.route("/authors/<int:author_id>/audiobooks", methods=["GET"])
+@conditional(author_etag)
+def get_author_audiobooks(author_id):
+    """Get an author and their audiobooks, keyset-paginated by id.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` for the next page.
+    """
+    per_page = min(max(request.args.get("per_page", 12, type=int), 1), 50)
+    fields = requested_fields()
+    mode = count_mode()
+    try:
+        cursor = parse_cursor(request.args.get("cursor"), AUTHOR_BOOKS_CURSOR)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    author = Author.query.get_or_404(author_id)
+    ids, has_next = author_audiobook_ids(
+        author_id, per_page, cursor["i"] if cursor else 0
+    )
+    total = filtered_total(
+        mode,
+        db.select(Audiobook.id).where(Audiobook.author_id == author_id),
+        f"author_total:{author_id}",
+    )
+
+    return jsonify({
+        "author": author.to_dict(),
+        "audiobooks": audiobook_dicts_in_order(ids, fields),
+        "pagination": pagination_info(None, per_page, total, has_next, mode),
+        "next_cursor": encode_cursor({"i": ids[-1]}) if has_next else None
     })
 
 @api.route("/audiobooks/search", methods=["GET"])
+@statement_timeout("SEARCH_STATEMENT_TIMEOUT_MS", 5000)
 def search_audiobooks():
-    """Search audiobooks by title, description, or author name."""
+    """Search audiobooks by title, author name, or description.
+
+    Uses the weighted full-text index, so results are ranked with title
+    matches ahead of author matches ahead of description matches. With
+    ``fuzzy=1`` it instead matches titles and author names by trigram
+    similarity (tunable with ``threshold``), which tolerates typos.
+    ``count=none|estimate|exact`` picks how the total is worked out.
+    With ``facets=1`` the response also carries match counts per category,
+    top author and duration bucket (null if they exceed their time budget).
+    """
     # Get search query and pagination parameters
     query = request.args.get("q", "")
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
+    fuzzy = request.args.get("fuzzy", 0, type=int) == 1
+    threshold = request.args.get("threshold", None, type=float)
+    with_facets = request.args.get("facets", 0, type=int) == 1
+    fields = requested_fields()
+    mode = count_mode()
     
     # Limit per_page to reasonable values
     per_page = min(max(per_page, 1), 50)
+    page = max(page, 1)
     
     if not query:
         return jsonify({"error": "Search query is required"}), 400
     
-    # Create search filter
-    search_term = f"%{query}%"
-    search_filter = or_(
-        Audiobook.title.ilike(search_term),
-        Audiobook.description.ilike(search_term),
-        Author.name.ilike(search_term)
-    )
-    
-    # Query audiobooks with join to authors
-    audiobooks_query = Audiobook.query.join(
-        Audiobook.author, isouter=True
-    ).filter(search_filter)
-    
-    # Get total count and paginate results
-    total = audiobooks_query.count()
-    audiobooks_paginated = audiobooks_query.paginate(page=page, per_page=per_page, error_out=False)
+    # Ranked IDs (and an exact total, if asked for) come back from one query
+    if fuzzy:
+        ids, total, has_next = fuzzy_page_ids(query, page, per_page, threshold, mode)
+    else:
+        ids, total, has_next = full_text_page_ids(query, page, per_page, mode)
+    audiobooks = audiobook_dicts_in_order(ids, fields)
     
+    response = {
+        "audiobooks": audiobooks,
+        "pagination": pagination_info(page, per_page, total, has_next, mode),
+        "query": query,
+        "fuzzy": fuzzy
+    }
+    if with_facets:
+        response["facets"] = search_facets(query, fuzzy, threshold)
+    return jsonify(response)
+
+@api.route("/suggest", methods=["GET"])
+@conditional(suggest_etag)
+def suggest():
+    """Suggest titles and authors starting with ``q``, most popular first.
+
+    Served from an in-process prefix index rather than the database, so it
+    is cheap enough to call on every keystroke.
+    """
+    query = request.args.get("q", "")
+    limit = min(max(request.args.get("limit", 8, type=int), 1), 20)
+
     return jsonify({
-        "audiobooks": [audiobook.to_dict() for audiobook in audiobooks_paginated.items],
-        "pagination": {
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": audiobooks_paginated.pages,
-            "has_next": audiobooks_paginated.has_next
-        },
-        "query": query
+        "query": query,
+        "suggestions": suggester.current().search(query, limit)
     })
 
 @api.route("/audiobooks/<int:audiobook_id>", methods=["GET"])
+@conditional(audiobook_etag)
 def get_audiobook(audiobook_id):
     """Get details for a specific audiobook."""
-    audiobook = Audiobook.query.get_or_404(audiobook_id)
-    return jsonify(audiobook.to_dict())
+    fields = requested_fields(default=AUDIOBOOK_FIELDS)
+    audiobook = (
+        Audiobook.query.options(*projection_options(fields))
+        .filter_by(id=audiobook_id)
+        .first_or_404()
+    )
+    return jsonify(audiobook.to_dict(fields))
 
 @api.route("/audiobooks/random", methods=["GET"])
 def get_random_audiobooks():
-    """Get random audiobooks."""
+    """Get random audiobooks, optionally from one category."""
     number = request.args.get("number", 5, type=int)
+    category_id = request.args.get("category", None, type=int)
     # Limit number to reasonable values
     number = min(max(number, 1), 20)
+    fields = requested_fields()
     
-    # Get total count of audiobooks
-    total_audiobooks = Audiobook.query.count()
-    
-    if total_audiobooks == 0:
-        return jsonify({"audiobooks": [], "total": 0})
-    
-    # If we have fewer audiobooks than requested, return all of them
-    if total_audiobooks <= number:
-        audiobooks = Audiobook.query.all()
-        return jsonify({
-            "audiobooks": [audiobook.to_dict() for audiobook in audiobooks],
-            "total": len(audiobooks)
-        })
-    
-    # Get random audiobooks using SQL's random() function
-    audiobooks = Audiobook.query.order_by(func.random()).limit(number).all()
+    # Sample distinct IDs from the shuffle_key index, then load those rows
+    ids = sample_audiobook_ids(number, category_id)
+    audiobooks = audiobook_dicts_in_order(ids, fields)
     
     return jsonify({
-        "audiobooks": [audiobook.to_dict() for audiobook in audiobooks],
+        "audiobooks": audiobooks,
         "total": len(audiobooks)
     })
 
+# Audiobook ids are Postgres integers; anything larger fails in the query
+MAX_AUDIOBOOK_ID = 2**31 - 1
+
+BULK_IDS_ERROR = f"ids must be a list of integers between 1 and {MAX_AUDIOBOOK_ID}"
+
+
+def bulk_audiobooks_response(requested):
+    """Build the response for a bulk fetch of audiobooks by ID.
+
+    Args:
+        requested (list): The ids. Anything that is not a plain int in the
+                          integer column's range, including bools and
+                          floats, is rejected with a 400.
+    """
+    if not all(
+        type(audiobook_id) is int and 1 <= audiobook_id <= MAX_AUDIOBOOK_ID
+        for audiobook_id in requested
+    ):
+        return jsonify({"error": BULK_IDS_ERROR}), 400
+
+    # Drop repeats but keep the order the caller asked for
+    requested = list(dict.fromkeys(requested))
+    max_ids = current_app.config.get("BULK_MAX_IDS", 200)
+    if len(requested) > max_ids:
+        return jsonify({"error": f"At most {max_ids} ids per request"}), 400
+
+    fields = requested_fields()
+    audiobooks = audiobook_dicts_in_order(requested, fields)
+    found = {audiobook["id"] for audiobook in audiobooks}
+
+    return jsonify({
+        "audiobooks": audiobooks,
+        "missing": [audiobook_id for audiobook_id in requested if audiobook_id not in found]
+    })
+
+@api.route("/audiobooks", methods=["POST"])
+def get_audiobooks_bulk():
+    """Get many audiobooks by ID in one request; for lists too long for a URL."""
+    data = request.get_json(silent=True) or {}
+    ids = data.get("ids")
+    if not isinstance(ids, list):
+        return jsonify({"error": BULK_IDS_ERROR}), 400
+    return bulk_audiobooks_response(ids)
+
 @api.route("/audiobooks", methods=["GET"])
 def get_all_audiobooks():
-    """Get all audiobooks with pagination, ordered randomly."""
+    """Get all audiobooks with pagination, in a seeded shuffle order.
+
+    The order is stable for a given ``seed`` (defaulting to one that rotates
+    on a schedule). Pass the returned ``next_cursor`` back as ``cursor`` to
+    fetch the following page with a keyset range scan.
+
+    ``count=none`` skips the total and ``count=estimate`` reads it from
+    table statistics.
+
+    With ``ids=1,2,3`` it instead returns exactly those audiobooks, in the
+    requested order, plus the list of IDs that do not exist.
+    """
+    if "ids" in request.args:
+        raw_ids = [part.strip() for part in request.args["ids"].split(",") if part.strip()]
+        # Ten digits at most, so huge strings never reach int()
+        if not all(re.fullmatch(r"[0-9]{1,10}", part) for part in raw_ids):
+            return jsonify({"error": BULK_IDS_ERROR}), 400
+        return bulk_audiobooks_response([int(part) for part in raw_ids])
+
     # Get pagination parameters
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 12, type=int)
-    
+    try:
+        cursor = parse_cursor(request.args.get("cursor"), SHUFFLE_CURSOR)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    seed = request.args.get("seed") or scheduled_seed()
+    fields = requested_fields()
+    mode = count_mode()
+
     # Limit per_page to reasonable values
     per_page = min(max(per_page, 1), 50)
-    
+    page = max(page, 1)
+
+    # A cursor carries the seed it was issued for, so follow-up pages
+    # keep the same order even if the scheduled seed rotates meanwhile
+    if cursor:
+        seed = cursor["s"]
+
     # Get total count of audiobooks
-    total_audiobooks = Audiobook.query.count()
-    
-    if total_audiobooks == 0:
+    total_audiobooks = audiobook_total(mode)
+
+    # Only trust a zero from a real count; an estimate can lag behind
+    if mode == "exact" and total_audiobooks == 0:
         return jsonify({
             "audiobooks": [],
-            "pagination": {
-                "total": 0,
-                "page": page,
-                "per_page": per_page,
-                "pages": 0,
-                "has_next": False
-            }
+            "pagination": pagination_info(page, per_page, 0, False, mode),
+            "next_cursor": None,
+            "seed": seed
         })
-    
-    # Get paginated audiobooks ordered randomly
-    audiobooks_paginated = Audiobook.query.order_by(func.random()).paginate(
-        page=page, per_page=per_page, error_out=False
+
+    # Get the page of IDs from the shuffle index, then load those rows
+    ids, next_position = shuffled_page_ids(
+        seed,
+        per_page,
+        position=cursor,
+        skip=0 if cursor else (page - 1) * per_page,
     )
-    
+    audiobooks = audiobook_dicts_in_order(ids, fields)
+
+    next_cursor = None
+    if next_position:
+        next_position["s"] = seed
+        next_cursor = encode_cursor(next_position)
+
     return jsonify({
-        "audiobooks": [audiobook.to_dict() for audiobook in audiobooks_paginated.items],
-        "pagination": {
-            "total": total_audiobooks,
-            "page": page,
-            "per_page": per_page,
-            "pages": audiobooks_paginated.pages,
-            "has_next": audiobooks_paginated.has_next
-        }
+        "audiobooks": audiobooks,
+        "pagination": pagination_info(
+            page, per_page, total_audiobooks, next_position is not None, mode
+        ),
+        "next_cursor": next_cursor,
+        "seed": seed
     })
 
 @api.route("/audiobooks/count", methods=["GET"])
 def get_audiobook_count():
     """Get the total number of audiobooks in the database."""
     try:
-        count = Audiobook.query.count()
+        count = count_all_audiobooks()
         return jsonify({"count": count})
     except Exception as e:
         current_app.logger.error(f"Error getting audiobook count: {str(e)}")
         return jsonify({"error": "Failed to get audiobook count"}), 500
 
 # Error handlers
+@api.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": error.description}), 400
+
 @api.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Resource not found"}), 404
 
+@api.errorhandler(OperationalError)
+def database_error(error):
+    # A query cancelled by its route's statement_timeout is a load problem,
+    # not a bug; tell the client to retry rather than reporting a 500
+    if getattr(error.orig, "pgcode", None) == QUERY_CANCELED:
+        current_app.logger.warning(f"Query cancelled by statement_timeout: {request.path}")
+        return jsonify({"error": "Query timed out"}), 503
+    current_app.logger.error(f"Database error: {str(error)}")
+    return jsonify({"error": "Internal server error"}), 500
+
 @api.errorhandler(500)
 def server_error(error):
     return jsonify({"error": "Internal server error"}), 500
@@ -1,20 +1,50 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, session
 from flask_login import login_required, current_user
-from flask_app.models import Audiobook, db
+from flask_app.models import Audiobook, db, user_favorites
+from flask_app.modules.cache import catalog_cache
+from flask_app.modules.http_cache import conditional, PRIVATE_CACHE_CONTROL
+from flask_app.modules.projection import requested_fields, projection_options
+from flask_app.modules.routing import (
+    use_replica_for_reads,
+    add_route_header,
+    mark_primary_reads,
+)
+from sqlalchemy import func
 
 favorites = Blueprint("favorites", __name__, url_prefix="/api/favorites")
+favorites.before_request(use_replica_for_reads)
+favorites.after_request(add_route_header)
+
+
+def favorites_etag():
+    # Read the user id straight from the signed session so a 304 needs no
+    # user load; without a logged-in session there is no validator and
+    # login_required rejects the request as usual
+    user_id = session.get("_user_id")
+    if not user_id:
+        return None
+    count, latest = db.session.execute(
+        db.select(func.count(), func.max(user_favorites.c.created_at)).where(
+            user_favorites.c.user_id == int(user_id)
+        )
+    ).one()
+    latest = int(latest.timestamp() * 1000000) if latest else 0
+    return f"favorites-{user_id}-{count}-{latest}-{catalog_cache.generation()}"
+
 
 @favorites.route("/", methods=["GET"])
+@conditional(favorites_etag, lambda: PRIVATE_CACHE_CONTROL, vary="Cookie")
 @login_required
 def get_favorites():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 12, type=int)
+    fields = requested_fields()
     
-    favorites_query = current_user.favorites
+    favorites_query = current_user.favorites.options(*projection_options(fields))
     paginated = favorites_query.paginate(page=page, per_page=per_page)
     
     return jsonify({
-        "audiobooks": [book.to_dict() for book in paginated.items],
+        "audiobooks": [book.to_dict(fields) for book in paginated.items],
         "pagination": {
             "page": paginated.page,
             "per_page": paginated.per_page,
@@ -35,6 +65,7 @@ def add_favorite(audiobook_id):
     
     current_user.favorites.append(audiobook)
     db.session.commit()
+    mark_primary_reads()
     
     return jsonify({"message": "Audiobook added to favorites"})
 
@@ -48,6 +79,7 @@ def remove_favorite(audiobook_id):
     
     current_user.favorites.remove(audiobook)
     db.session.commit()
+    mark_primary_reads()
     
     return jsonify({"message": "Audiobook removed from favorites"})
 
@@ -58,3 +90,7 @@ def check_favorite(audiobook_id):
     is_favorite = audiobook in current_user.favorites.all()
     
     return jsonify({"is_favorite": is_favorite})
+
+@favorites.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": error.description}), 400
@@ -0,0 +1,20 @@
+import hmac
+import os
+from flask import Blueprint, request, abort, current_app
+from flask_app.modules.metrics import render_latest, request_metrics
+
+metrics = Blueprint("metrics", __name__)
+
+
+@metrics.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Prometheus scrape endpoint. With METRICS_TOKEN set, scrapers send it as a bearer token."""
+    token = os.getenv("METRICS_TOKEN")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(supplied.encode(), token.encode()):
+            abort(401)
+
+    request_metrics.sync()
+    body, content_type = render_latest()
+    return current_app.response_class(body, content_type=content_type)
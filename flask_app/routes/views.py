@@ -1,5 +1,7 @@
-from flask import Blueprint, current_app, request
-from flask_app.modules.extensions import db
+from flask import Blueprint, current_app, request, jsonify, stream_with_context
+from flask_app.models import AUDIOBOOK_FIELDS
+from flask_app.modules.export import audiobook_export_lines, gzip_stream
+from flask_app.modules.projection import requested_fields
 
 views = Blueprint("views", __name__)
 
@@ -11,28 +13,39 @@ def hello():
 
 @views.route("/audiobooks", methods=["GET"])
 def get_audiobooks():
-    """Fetches all audiobooks from the database using SQLAlchemy."""
-    try:
-        # Use SQLAlchemy 2.0 style query
-        audiobooks_from_db = (
-            db.session.execute(db.select(Audiobook).order_by(Audiobook.id))
-            .scalars()
-            .all()
-        )
-
-        # Convert model instances to dictionaries using the method defined in the model
-        audiobooks_list = [book.to_dict() for book in audiobooks_from_db]
-
-        return jsonify(audiobooks_list), 200
-    except Exception as e:
-        # Log the error for better debugging
-        app.logger.error(f"Error fetching audiobooks: {e}", exc_info=True)
-        return (
-            jsonify(
-                {
-                    "error": "An internal server error occurred while fetching audiobooks."
-                }
-            ),
-            500,
-        )
-    # Flask-SQLAlchemy handles session management automatically per request
+    """Streams the whole catalog as NDJSON, one audiobook per line, by id.
+
+    Rows are written as they are read, so memory stays flat at any catalog
+    size. A failure mid-stream aborts the transfer rather than ending it
+    cleanly. Pass ``after_id`` (the last id received) to resume an interrupted
+    export and ``fields`` to export a subset. The body is gzipped when the
+    client accepts it.
+    """
+    after_id = request.args.get("after_id", 0, type=int)
+    fields = requested_fields(default=AUDIOBOOK_FIELDS)
+
+    def generate():
+        try:
+            yield from audiobook_export_lines(fields, after_id=after_id)
+        except Exception as e:
+            # Headers are already sent, so log and re-raise: the server then
+            # aborts the transfer without the final chunk (and gzip without
+            # its trailer), which clients detect as an incomplete export and
+            # resume from their last id
+            current_app.logger.error(f"Error exporting audiobooks: {e}", exc_info=True)
+            raise
+
+    body = stream_with_context(generate())
+    headers = {"Vary": "Accept-Encoding", "Cache-Control": "no-store"}
+    if "gzip" in request.accept_encodings:
+        body = gzip_stream(body)
+        headers["Content-Encoding"] = "gzip"
+
+    return current_app.response_class(
+        body, mimetype="application/x-ndjson", headers=headers
+    )
+
+
+@views.errorhandler(400)
+def bad_request(error):
+    return jsonify({"error": error.description}), 400
@@ -39,20 +39,31 @@ export const logoutUser = async () => {
 }
 
 // API functions
+export const fetchHomepage = async () => {
+  return api.get('/homepage')
+}
+
 export const fetchCategories = async () => {
   return api.get('/categories')
 }
 
+// The category page only needs has_next, so skip the total
 export const fetchCategoryAudiobooks = async (categoryId, page = 1, perPage = 12) => {
   return api.get(`/categories/${categoryId}`, {
-    params: { page, per_page: perPage }
+    params: { page, per_page: perPage, count: 'none' }
   })
 }
 
-export const searchAudiobooks = async (query, page = 1, perPage = 12) => {
-  return api.get('/audiobooks/search', {
-    params: { q: query, page, per_page: perPage }
-  })
+export const searchAudiobooks = async (query, page = 1, perPage = 12, fuzzy = false) => {
+  const params = { q: query, page, per_page: perPage }
+  if (fuzzy) params.fuzzy = 1
+  // The total only changes with the query; later pages reuse the first one
+  if (page > 1) params.count = 'none'
+  return api.get('/audiobooks/search', { params })
+}
+
+export const fetchSuggestions = async (query, limit = 8) => {
+  return api.get('/suggest', { params: { q: query, limit } })
 }
 
 export const fetchAudiobookDetail = async (audiobookId) => {
@@ -65,10 +76,13 @@ export const fetchRandomAudiobooks = async (number = 5) => {
   })
 }
 
-export const fetchAllAudiobooks = async (page = 1, perPage = 12) => {
-  return api.get('/audiobooks', {
-    params: { page, per_page: perPage }
-  })
+export const fetchAllAudiobooks = async (page = 1, perPage = 12, cursor = null) => {
+  const params = { page, per_page: perPage }
+  if (cursor) {
+    params.cursor = cursor
+    params.count = 'none'
+  }
+  return api.get('/audiobooks', { params })
 }
 
 export const fetchAudiobookCount = async () => {
@@ -4,11 +4,13 @@ import { useStore } from '../store'
 import Spinner from './Spinner'
 import { toast } from 'react-hot-toast'
 import { useAuth } from '../context/AuthContext'
+import { fetchSuggestions } from '../api'
 
 function Layout() {
   const [isSticky, setIsSticky] = useState(false)
   const headerRef = useRef(null)
   const [searchQuery, setSearchQuery] = useState('')
+  const [suggestions, setSuggestions] = useState([])
   const navigate = useNavigate()
   const { categories, fetchCategories, loading } = useStore()
   const { user, logout, isAuthenticated } = useAuth()
@@ -42,6 +44,29 @@ function Layout() {
     }
   }, [])
 
+  // Fetch autocomplete suggestions once typing pauses briefly
+  useEffect(() => {
+    const query = searchQuery.trim()
+    if (!query) {
+      setSuggestions([])
+      return
+    }
+
+    let cancelled = false
+    const timer = setTimeout(() => {
+      fetchSuggestions(query)
+        .then(data => {
+          if (!cancelled) setSuggestions(data.suggestions)
+        })
+        .catch(() => {})
+    }, 120)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
+    }
+  }, [searchQuery])
+
   const handleSearch = (e) => {
     e.preventDefault()
     if (searchQuery.trim()) {
@@ -113,8 +138,14 @@ function Layout() {
                     placeholder="Search audiobooks..."
                     value={searchQuery}
                     onChange={(e) => setSearchQuery(e.target.value)}
+                    list="search-suggestions"
                     className="w-full px-4 py-2 border rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
                   />
+                  <datalist id="search-suggestions">
+                    {suggestions.map(suggestion => (
+                      <option key={`${suggestion.type}-${suggestion.id}`} value={suggestion.label} />
+                    ))}
+                  </datalist>
                   <button
                     type="submit"
                     className="absolute right-2 top-1/2 transform -translate-y-1/2 text-gray-500 hover:text-blue-600"
@@ -2,7 +2,7 @@ import { useEffect, useState, useRef, useCallback } from 'react'
 import { toast } from 'react-hot-toast'
 import AudiobookGrid from '../components/AudiobookGrid'
 import Spinner from '../components/Spinner'
-import { fetchAllAudiobooks, fetchAudiobookCount } from '../api'
+import { fetchAllAudiobooks, fetchHomepage } from '../api'
 
 function HomePage() {
   const [audiobooks, setAudiobooks] = useState([])
@@ -12,7 +12,8 @@ function HomePage() {
   const [pagination, setPagination] = useState({
     page: 1,
     hasNext: false,
-    total: 0
+    total: 0,
+    nextCursor: null
   })
   const observer = useRef()
 
@@ -36,19 +37,18 @@ function HomePage() {
       try {
         setLoading(true)
 
-        // Fetch both the audiobooks and the total count
+        // The precomputed homepage bundle carries the first page of the
+        // feed and the total count; later pages continue from its cursor
         try {
-          const [audiobooksData, countData] = await Promise.all([
-            fetchAllAudiobooks(1),
-            fetchAudiobookCount()
-          ])
+          const bundle = await fetchHomepage()
 
-          setAudiobooks(audiobooksData.audiobooks)
-          setTotalBooks(countData?.count || 0)
+          setAudiobooks(bundle.feed.audiobooks)
+          setTotalBooks(bundle.count || 0)
           setPagination({
-            page: audiobooksData.pagination.page,
-            hasNext: audiobooksData.pagination.has_next,
-            total: audiobooksData.pagination.total
+            page: 1,
+            hasNext: bundle.feed.next_cursor !== null,
+            total: bundle.count,
+            nextCursor: bundle.feed.next_cursor
           })
         } catch (error) {
           console.error('Error fetching data:', error)
@@ -69,13 +69,14 @@ function HomePage() {
     try {
       setLoadingMore(true)
       const nextPage = pagination.page + 1
-      const data = await fetchAllAudiobooks(nextPage)
+      const data = await fetchAllAudiobooks(nextPage, 12, pagination.nextCursor)
 
       setAudiobooks(prev => [...prev, ...data.audiobooks])
       setPagination({
         page: data.pagination.page,
         hasNext: data.pagination.has_next,
-        total: data.pagination.total
+        total: pagination.total,
+        nextCursor: data.next_cursor
       })
     } catch (error) {
       console.error('Error loading more audiobooks:', error)
@@ -15,7 +15,8 @@ function SearchResultsPage() {
   const [pagination, setPagination] = useState({
     page: 1,
     hasNext: false,
-    total: 0
+    total: 0,
+    fuzzy: false
   })
   
   const observer = useRef()
@@ -39,14 +40,19 @@ function SearchResultsPage() {
       try {
         setLoading(true)
         setAudiobooks([])
-        setPagination({ page: 1, hasNext: false, total: 0 })
+        setPagination({ page: 1, hasNext: false, total: 0, fuzzy: false })
         
-        const data = await searchAudiobooks(query, 1)
+        let data = await searchAudiobooks(query, 1)
+        // Nothing matched exactly; retry tolerating typos
+        if (data.pagination.total === 0) {
+          data = await searchAudiobooks(query, 1, 12, true)
+        }
         setAudiobooks(data.audiobooks)
         setPagination({
           page: data.pagination.page,
           hasNext: data.pagination.has_next,
-          total: data.pagination.total
+          total: data.pagination.total,
+          fuzzy: data.fuzzy
         })
       } catch (error) {
         console.error('Error searching audiobooks:', error)
@@ -65,13 +71,14 @@ function SearchResultsPage() {
     try {
       setLoadingMore(true)
       const nextPage = pagination.page + 1
-      const data = await searchAudiobooks(query, nextPage)
+      const data = await searchAudiobooks(query, nextPage, 12, pagination.fuzzy)
       
       setAudiobooks(prev => [...prev, ...data.audiobooks])
       setPagination({
         page: data.pagination.page,
         hasNext: data.pagination.has_next,
-        total: data.pagination.total
+        total: pagination.total,
+        fuzzy: data.fuzzy
       })
     } catch (error) {
       console.error('Error loading more search results:', error)
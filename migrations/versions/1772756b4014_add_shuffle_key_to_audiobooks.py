@@ -0,0 +1,30 @@
+"""Add shuffle_key to audiobooks
+
+Revision ID: 1772756b4014
+Revises: 1f2731e232a1
+Create Date: 2026-10-17 09:12:31.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1772756b4014'
+down_revision = '1f2731e232a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # random() is volatile, so Postgres evaluates it per existing row while
+    # rewriting the table, giving every audiobook its own key
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shuffle_key', sa.Float(), server_default=sa.text('random()'), nullable=False))
+        batch_op.create_index('ix_audiobooks_shuffle_key_id', ['shuffle_key', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.drop_index('ix_audiobooks_shuffle_key_id')
+        batch_op.drop_column('shuffle_key')
@@ -0,0 +1,27 @@
+"""Add pg_trgm indexes on author names and audiobook titles
+
+Revision ID: 1b9720885fcf
+Revises: 5c4f07f41a56
+Create Date: 2026-10-17 11:20:07.634502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1b9720885fcf'
+down_revision = '5c4f07f41a56'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index('ix_authors_name_trgm', 'authors', ['name'], unique=False, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'})
+    op.create_index('ix_audiobooks_title_trgm', 'audiobooks', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def downgrade():
+    op.drop_index('ix_audiobooks_title_trgm', table_name='audiobooks', postgresql_using='gin')
+    op.drop_index('ix_authors_name_trgm', table_name='authors', postgresql_using='gin')
@@ -0,0 +1,25 @@
+"""Add catalog_generation sequence
+
+Revision ID: 20bb22de52f6
+Revises: 1b9720885fcf
+Create Date: 2026-10-17 12:41:55.287340
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '20bb22de52f6'
+down_revision = '1b9720885fcf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bumped by every catalog write; response caches key their entries on it
+    op.execute("CREATE SEQUENCE IF NOT EXISTS catalog_generation")
+
+
+def downgrade():
+    op.execute("DROP SEQUENCE IF EXISTS catalog_generation")
@@ -0,0 +1,30 @@
+"""Add shuffle_key to audiobook_categories
+
+Revision ID: 3d8e2f61a9c4
+Revises: 74544ccdc137
+Create Date: 2026-10-17 18:20:44.519302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3d8e2f61a9c4'
+down_revision = '74544ccdc137'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # As on audiobooks, the volatile default gives every existing link its
+    # own key; the index lets category samples probe only that category
+    with op.batch_alter_table('audiobook_categories', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shuffle_key', sa.Float(), server_default=sa.text('random()'), nullable=False))
+        batch_op.create_index('ix_audiobook_categories_category_shuffle', ['category_id', 'shuffle_key', 'audiobook_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('audiobook_categories', schema=None) as batch_op:
+        batch_op.drop_index('ix_audiobook_categories_category_shuffle')
+        batch_op.drop_column('shuffle_key')
@@ -0,0 +1,74 @@
+"""Add full-text search vector to audiobooks
+
+Revision ID: 5c4f07f41a56
+Revises: 1772756b4014
+Create Date: 2026-10-17 10:03:48.115920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '5c4f07f41a56'
+down_revision = '1772756b4014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+
+    # Title is weighted A, author name B and description C. The author name
+    # lives in another table, so a trigger builds the vector instead of a
+    # generated column.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION audiobooks_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(
+                    (SELECT name FROM authors WHERE id = NEW.author_id), '')), 'B') ||
+                setweight(to_tsvector('english', coalesce(NEW.description, '')), 'C');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER audiobooks_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF title, description, author_id ON audiobooks
+        FOR EACH ROW EXECUTE FUNCTION audiobooks_search_vector_update()
+    """)
+
+    # Renaming an author re-runs the trigger for that author's audiobooks
+    op.execute("""
+        CREATE OR REPLACE FUNCTION authors_search_vector_propagate() RETURNS trigger AS $$
+        BEGIN
+            UPDATE audiobooks SET author_id = author_id WHERE author_id = NEW.id;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER authors_search_vector_trigger
+        AFTER UPDATE OF name ON authors
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name)
+        EXECUTE FUNCTION authors_search_vector_propagate()
+    """)
+
+    # Backfill existing rows through the trigger
+    op.execute("UPDATE audiobooks SET title = title")
+
+    op.create_index('ix_audiobooks_search_vector', 'audiobooks', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    op.drop_index('ix_audiobooks_search_vector', table_name='audiobooks', postgresql_using='gin')
+    op.execute("DROP TRIGGER IF EXISTS authors_search_vector_trigger ON authors")
+    op.execute("DROP FUNCTION IF EXISTS authors_search_vector_propagate()")
+    op.execute("DROP TRIGGER IF EXISTS audiobooks_search_vector_trigger ON audiobooks")
+    op.execute("DROP FUNCTION IF EXISTS audiobooks_search_vector_update()")
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
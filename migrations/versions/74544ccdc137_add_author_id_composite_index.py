@@ -0,0 +1,30 @@
+"""Replace audiobooks author_id index with (author_id, id)
+
+Revision ID: 74544ccdc137
+Revises: 20bb22de52f6
+Create Date: 2026-10-17 17:52:08.611934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '74544ccdc137'
+down_revision = '20bb22de52f6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The composite index serves author keyset pages (author_id = :a AND
+    # id > :after ORDER BY id) and every lookup the single-column one did
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.create_index('ix_audiobooks_author_id_id', ['author_id', 'id'], unique=False)
+        batch_op.drop_index('ix_audiobooks_author_id')
+
+
+def downgrade():
+    with op.batch_alter_table('audiobooks', schema=None) as batch_op:
+        batch_op.create_index('ix_audiobooks_author_id', ['author_id'], unique=False)
+        batch_op.drop_index('ix_audiobooks_author_id_id')
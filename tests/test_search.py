@@ -0,0 +1,66 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+os.environ.setdefault("DB_USER", "test")
+os.environ.setdefault("DB_PASSWORD", "test")
+os.environ.setdefault("DB_NAME", "test")
+
+
+@pytest.fixture
+def app():
+    from flask_app import register_extensions
+
+    app = Flask(__name__)
+    register_extensions(app)
+    with app.app_context():
+        yield app
+
+
+class FakeResult:
+    def __init__(self, rows=(), scalar=None):
+        self._rows = list(rows)
+        self._scalar = scalar
+
+    def all(self):
+        return self._rows
+
+    def scalar(self):
+        return self._scalar
+
+
+def test_fuzzy_total_past_last_page(app, monkeypatch):
+    from flask_app.modules import search
+    from flask_app.modules.extensions import db
+
+    statements = []
+
+    def execute(statement, params=None):
+        statements.append(statement)
+        if statement is search.FUZZY_COUNT_SQL:
+            return FakeResult(scalar=12)
+        return FakeResult()
+
+    monkeypatch.setattr(db.session, "execute", execute)
+
+    ids, total, has_next = search.fuzzy_page_ids("tolkein", page=5, per_page=10)
+
+    assert (ids, total, has_next) == ([], 12, False)
+    assert search.FUZZY_COUNT_SQL in statements
+
+
+def test_fuzzy_total_rides_on_window_count(app, monkeypatch):
+    from flask_app.modules import search
+    from flask_app.modules.extensions import db
+
+    rows = [SimpleNamespace(id=1, total=3), SimpleNamespace(id=2, total=3)]
+
+    def execute(statement, params=None):
+        assert statement is not search.FUZZY_COUNT_SQL
+        return FakeResult(rows)
+
+    monkeypatch.setattr(db.session, "execute", execute)
+
+    assert search.fuzzy_page_ids("tolkein", page=1, per_page=10) == ([1, 2], 3, False)